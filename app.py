@@ -3,25 +3,74 @@ import os
 import sys
 import re
 import json
+import hashlib
 import time
 import shutil
 import subprocess
+import selectors
 import asyncio
+import copy
 import glob
 import random
 import threading
 import traceback
+from collections import deque
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 import tempfile
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from PIL import Image
 
+import numpy as np
 import streamlit as st
 import yt_dlp
 import requests
 
+try:
+    import orjson  # C 扩展，状态 JSON 的序列化/反序列化比标准库快数倍
+except ImportError:
+    orjson = None
+
+# 到翻译 API 的请求共用一个 Session：连接池 + keep-alive 复用 TCP/TLS 连接，
+# 省掉裸 requests.post 每次 200-400ms 的握手；requests.Session 线程安全，
+# 各翻译 worker 线程可直接共享
+_API_SESSION = requests.Session()
+_API_SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_API_SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+def _dumps_status(status):
+    """把状态 dict 序列化成 bytes，优先 orjson"""
+    if orjson is not None:
+        return orjson.dumps(status, option=orjson.OPT_INDENT_2)
+    return json.dumps(status, ensure_ascii=False, indent=2).encode('utf-8')
+
+def _loads_status(data):
+    """从 bytes 反序列化状态 dict，优先 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _post_llm(url, payload, headers, timeout=60):
+    """POST 一个 LLM 请求，返回解析好的响应 dict，编解码优先走 orjson。
+
+    翻译系统提示约 1.5KB 中文，每个批次都要随 payload 重新编码一遍，
+    响应体也要再解码一遍；预编码成 bytes 走 data= 并从 response.content
+    解码，两头都绕开标准库 json，大量分段并发时省下可观的 CPU。
+    """
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    post_headers = dict(headers)
+    post_headers['Content-Type'] = 'application/json'
+    response = _API_SESSION.post(url, data=body, headers=post_headers, timeout=timeout)
+    response.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
 from src.local_translator import check_dependencies, download_model, translate_subtitle_file, translate_title_and_tags_local
 from src.speech_rate_optimizer import optimize_speaking_rate_in_file
 
@@ -79,45 +128,246 @@ def update_yt_dlp():
     except Exception as e:
         print(f"yt-dlp 更新过程出错: {e}")
 
-# 启动时自动更新 yt-dlp（仅在进程首次启动时执行一次）
-_yt_dlp_updated = globals().get('_yt_dlp_updated', False)
-if not _yt_dlp_updated:
-    update_yt_dlp()
-    _yt_dlp_updated = True
+# 自动更新默认关闭：pip 子进程 + 网络 I/O（60s 超时）会拖慢每次启动/worker 拉起；
+# 设 YT_TO_BILI_AUTO_UPDATE=1 开启，且用戳文件限制为每天最多检查一次
+# （戳文件跨进程生效，不依赖会被 Streamlit rerun 语义搞混的模块全局变量）
+if os.environ.get('YT_TO_BILI_AUTO_UPDATE') == '1':
+    _upd_stamp = os.path.join(tempfile.gettempdir(),
+                              '.ytdlp_upd_' + datetime.now().strftime('%Y%m%d'))
+    if not os.path.exists(_upd_stamp):
+        update_yt_dlp()
+        Path(_upd_stamp).touch()
+
+# yt-dlp 可执行程序只解析一次（Streamlit 每次交互都会重跑脚本，
+# 没必要每次调用都先试 binary 再靠 127 退回 python -m）
+_YT_DLP_EXE = globals().get('_YT_DLP_EXE')
+if _YT_DLP_EXE is None:
+    _YT_DLP_EXE = [shutil.which('yt-dlp') or 'yt-dlp']
+    if _YT_DLP_EXE == ['yt-dlp']:
+        _YT_DLP_EXE = [sys.executable, '-m', 'yt_dlp']
+
+_COOKIEJAR_CACHE = {}
+
+def _get_cookiejar(cookies_path):
+    """按 (路径, mtime) 缓存解析好的 cookie jar。
+
+    工作流每一步都带同一份 cookies 调 yt-dlp，每次都重新解析文件；
+    文件没变时直接复用解析结果。
+    """
+    if not cookies_path:
+        return None
+    try:
+        key = (cookies_path, os.path.getmtime(cookies_path))
+    except OSError:
+        return None
+    jar = _COOKIEJAR_CACHE.get(key)
+    if jar is None:
+        try:
+            from yt_dlp.cookies import YoutubeDLCookieJar
+            jar = YoutubeDLCookieJar(cookies_path)
+            jar.load(ignore_discard=True, ignore_expires=True)
+        except Exception as e:
+            print(f"预解析 cookies 失败({e})，交由 yt-dlp 自行加载")
+            return None
+        _COOKIEJAR_CACHE[key] = jar
+    return jar
+
+def _run_yt_dlp_inprocess(argv, cookiejar=None):
+    """在当前进程内执行一组 yt-dlp CLI 参数。
 
-def run_yt_dlp_subprocess(args, cookies_path=None):
-    # Prefer calling yt-dlp directly to avoid python -m issues (like 'main.py error')
-    cmd = [
-        'yt-dlp',
+    parse_options 把 CLI 参数翻译成 ydl_opts，复用已加载的 yt_dlp 模块，
+    省掉每次调用 1~2s 的子进程解释器启动和 extractor 注册。
+    """
+    parser, opts, urls, ydl_opts = yt_dlp.parse_options(argv)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        if cookiejar is not None:
+            try:
+                # cookiejar 是 cached_property，实例级赋值即可覆盖，
+                # 让本次调用跳过 cookie 文件解析；版本不支持就保持原行为
+                ydl.cookiejar = cookiejar
+            except AttributeError:
+                pass
+        retcode = ydl.download(urls)
+    if retcode != 0:
+        raise Exception(f"yt-dlp 返回码 {retcode}")
+    return ""
+
+def run_yt_dlp_subprocess(args, cookies_path=None, capture_stdout=True):
+    common = [
         '--extractor-args', 'youtube:player_client=default,-web_safari',
         '--remote-components', 'ejs:github',
         '--no-playlist'
     ]
     if cookies_path:
-        cmd.extend(['--cookies', cookies_path])
-    
-    cmd.extend(args)
-    
+        common.extend(['--cookies', cookies_path])
+
+    # 只有调用方要 stdout 且参数里确实有 JSON 输出类开关时才需要捕获
+    needs_stdout = capture_stdout and any(a in ('--print-json', '--dump-json', '-j', '-J') for a in args)
+
+    # 不需要捕获 stdout 的调用（下载类）直接在本进程里跑 YoutubeDL；
+    # JSON 输出类调用仍走子进程，方便捕获 stdout，失败也互为兜底
+    if not needs_stdout:
+        try:
+            return _run_yt_dlp_inprocess(common + list(args), cookiejar=_get_cookiejar(cookies_path))
+        except Exception as e:
+            print(f"进程内 yt-dlp 执行失败({e})，回退到子进程")
+
+    # Prefer calling yt-dlp directly to avoid python -m issues (like 'main.py error')
+    cmd = _YT_DLP_EXE + common + list(args)
+
     # Debug info
     print(f"Executing yt-dlp command: {' '.join(cmd)}")
-    
+
+    # 下载类调用的进度输出没人看，直接丢 DEVNULL，免得整段缓冲进内存再解码
+    stdout_target = subprocess.PIPE if needs_stdout else subprocess.DEVNULL
     # Use shell=False for security, assuming args are clean
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-    
+    result = subprocess.run(cmd, stdout=stdout_target, stderr=subprocess.PIPE,
+                            text=True, encoding='utf-8', errors='ignore')
+
     if result.returncode != 0:
         # Fallback to python -m yt_dlp if binary is not found, but log it
-        if "No such file or directory" in str(result.stderr) or result.returncode == 127:
+        if cmd[0] != sys.executable and ("No such file or directory" in str(result.stderr) or result.returncode == 127):
              print("yt-dlp binary not found, falling back to python -m yt_dlp")
-             import sys
              cmd[0] = sys.executable
              cmd.insert(1, '-m')
              cmd.insert(2, 'yt_dlp')
              print(f"Executing fallback command: {' '.join(cmd)}")
-             result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+             result = subprocess.run(cmd, stdout=stdout_target, stderr=subprocess.PIPE,
+                                     text=True, encoding='utf-8', errors='ignore')
 
         if result.returncode != 0:
             raise Exception(f"yt-dlp error: {result.stderr}")
-    return result.stdout
+    return result.stdout if needs_stdout else ''
+
+def find_files_with_prefix(base_path):
+    """列出与 base_path 同目录、文件名以 '<basename>.' 开头的文件。
+
+    等价于 glob.glob(f"{base_path}.*")，但用 os.scandir 做前缀过滤，
+    不走 fnmatch 通配状态机，目录越大优势越明显。
+    """
+    prefix = os.path.basename(base_path) + '.'
+    dirname = os.path.dirname(base_path) or '.'
+    try:
+        with os.scandir(dirname) as it:
+            return [e.path for e in it if e.name.startswith(prefix) and e.is_file()]
+    except FileNotFoundError:
+        return []
+
+def ensure_aac_audio(audio_path):
+    """返回可直接流拷贝进 mp4 的 AAC 音频路径，失败返回 None。
+
+    源音轨已经是 AAC 就直接返回原路径；否则转码一次到同名 .m4a 缓存，
+    之后只要 .m4a 不比源文件旧就直接复用，合并时用 -c:a copy
+    省掉每次 mux 的整段音频解码+重编码。
+    """
+    try:
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=codec_name', '-of', 'default=nw=1:nk=1',
+             audio_path],
+            capture_output=True)
+        if probe.stdout.decode('utf-8', 'replace').strip() == 'aac':
+            return audio_path
+    except Exception:
+        return None
+    m4a_path = os.path.splitext(audio_path)[0] + '.m4a'
+    try:
+        if os.path.getmtime(m4a_path) >= os.path.getmtime(audio_path):
+            return m4a_path
+    except OSError:
+        pass
+    try:
+        run_ffmpeg(['-y', '-i', audio_path, '-c:a', 'aac', '-b:a', '128k',
+                    '-aac_coder', 'fast', m4a_path])
+        return m4a_path
+    except Exception:
+        # 转码缓存失败不致命，调用方回退为 mux 时现场编码
+        return None
+
+def fast_copy(src, dst, bufsize=4 * 1024 * 1024):
+    """大缓冲区复制文件内容（不复制元数据）。
+
+    shutil.copy2 默认 64KB 缓冲，几百 MB 的视频要上千次 read/write 系统调用；
+    Linux 上优先走 os.sendfile 零拷贝，其他平台退回 4MB 缓冲的 copyfileobj。
+    """
+    with open(src, 'rb', buffering=0) as s, open(dst, 'wb', buffering=0) as d:
+        try:
+            # 单次 sendfile 最多传约 2GiB 且可能短传，必须按返回值循环推进偏移，
+            # 否则超长视频会被静默截断
+            size = os.fstat(s.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(d.fileno(), s.fileno(), offset, size - offset)
+                if sent == 0:
+                    raise OSError("sendfile 提前到达 EOF")
+                offset += sent
+        except (AttributeError, OSError):
+            if d.seekable():
+                d.seek(0)
+                d.truncate()
+            shutil.copyfileobj(s, d, bufsize)
+
+def _time_to_seconds(ts):
+    """把 'MM:SS' / 'HH:MM:SS'（可带小数秒）形式的时间转成秒数"""
+    seconds = 0.0
+    for part in ts.strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+_NVENC_AVAILABLE = None
+
+def nvenc_available():
+    """检测本机 ffmpeg 是否带 h264_nvenc 编码器（只探测一次并缓存结果）"""
+    global _NVENC_AVAILABLE
+    if _NVENC_AVAILABLE is None:
+        try:
+            probe = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                   capture_output=True, timeout=15)
+            _NVENC_AVAILABLE = b'h264_nvenc' in probe.stdout
+        except Exception:
+            _NVENC_AVAILABLE = False
+    return _NVENC_AVAILABLE
+
+def run_ffmpeg(args, **kwargs):
+    """运行 ffmpeg 命令（args 不含开头的 'ffmpeg'）。
+
+    流拷贝(-c copy / -c:v copy)命令失败时自动降级重试：
+    剪辑点落在非关键帧等场景必须重编码，优先用 NVENC 硬件编码，
+    没有 NVENC 时退回 libx264 veryfast。
+    """
+    kwargs.setdefault('check', True)
+    # stdout 不看就直接丢给 DEVNULL；stderr 以 bytes 捕获，
+    # 只在失败时解码一次，成功路径不跑 Python 层的 UTF-8 解码
+    kwargs.pop('text', None)
+    kwargs.setdefault('stdout', subprocess.DEVNULL)
+    kwargs.setdefault('stderr', subprocess.PIPE)
+    try:
+        return subprocess.run(['ffmpeg'] + args, **kwargs)
+    except subprocess.CalledProcessError as e:
+        if 'copy' not in args:
+            if isinstance(e.stderr, bytes):
+                print(f"ffmpeg 失败: {e.stderr.decode('utf-8', 'replace')[-2000:]}")
+            raise
+        if nvenc_available():
+            prefix = ['-hwaccel', 'cuda']
+            encoder = ['-c:v', 'h264_nvenc', '-preset', 'p4', '-rc', 'vbr', '-cq', '23']
+        else:
+            prefix = []
+            encoder = ['-c:v', 'libx264', '-preset', 'veryfast']
+        retry_args = []
+        skip_next = False
+        for j, a in enumerate(args):
+            if skip_next:
+                skip_next = False
+                continue
+            if a in ('-c', '-c:v') and j + 1 < len(args) and args[j + 1] == 'copy':
+                retry_args.extend(encoder)
+                if a == '-c':
+                    retry_args.extend(['-c:a', 'copy'])
+                skip_next = True
+            else:
+                retry_args.append(a)
+        return subprocess.run(['ffmpeg'] + prefix + retry_args, **kwargs)
 
 import edge_tts
 from bilibili_api import sync, video_uploader, Credential
@@ -235,11 +485,77 @@ api_configs = load_api_configs()
 # --- 状态管理与后台任务相关 ---
 STATUS_FILE = "workflow_status.json"
 
+# 状态里最多保留的日志条数：logs 无上限增长会让每次状态落盘的
+# JSON 序列化成本随运行时间线性变差，只留最近这些就够排查了
+_MAX_STATUS_LOGS = 200
+
+
+def _append_status_log(status, message):
+    logs = status.setdefault("logs", [])
+    logs.append(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+    if len(logs) > _MAX_STATUS_LOGS:
+        del logs[:-_MAX_STATUS_LOGS]
+
+
 class WorkflowManager:
+    # 状态文件仍是唯一的真相源，内存 dict 只是它的缓存：
+    # Streamlit 每次 rerun 都在新模块里重建本类，后台线程握着旧模块的类，
+    # 两边各有一份 _state，互相只能通过状态文件看到对方的写入
+    # （中止按钮写新模块、worker 读旧模块，纯内存态会吞掉中止请求）。
+    # 读取时先 stat 一次状态文件，mtime 比缓存新才整读 JSON，
+    # 没变则继续用缓存；上传回调每个分片都触发一次 update_step，
+    # 过程性更新最多每秒落盘一次，终态(success/error)立即落盘
+    _state = {}
+    _state_mtime = {}
+    _last_flush = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def get_status_file_path(temp_dir):
         return os.path.join(temp_dir, STATUS_FILE)
 
+    @staticmethod
+    def _load_locked(temp_dir):
+        """持锁调用：磁盘文件比缓存新（或缓存缺失）时从磁盘重读"""
+        file_path = WorkflowManager.get_status_file_path(temp_dir)
+        try:
+            disk_mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            disk_mtime = None
+        status = WorkflowManager._state.get(temp_dir)
+        stale = (disk_mtime is not None
+                 and disk_mtime > WorkflowManager._state_mtime.get(temp_dir, -1))
+        if (status is None or stale) and disk_mtime is not None:
+            try:
+                with open(file_path, 'rb') as f:
+                    fresh = _loads_status(f.read())
+            except Exception:
+                fresh = None
+            if fresh is not None:
+                status = fresh
+                WorkflowManager._state[temp_dir] = fresh
+                WorkflowManager._state_mtime[temp_dir] = disk_mtime
+        return status
+
+    @staticmethod
+    def _flush(temp_dir, status):
+        """持锁调用：把当前状态整体写盘"""
+        file_path = WorkflowManager.get_status_file_path(temp_dir)
+        try:
+            # 先写临时文件再 os.replace，轮询方永远不会读到半个 JSON
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_dumps_status(status))
+            os.replace(tmp_path, file_path)
+            WorkflowManager._last_flush[temp_dir] = time.monotonic()
+            # 记下自己刚写出的 mtime，下次 _load_locked 不会把它当成别人的更新重读
+            try:
+                WorkflowManager._state_mtime[temp_dir] = os.stat(file_path).st_mtime_ns
+            except OSError:
+                pass
+        except Exception as e:
+            print(f"保存状态失败: {e}")
+
     @staticmethod
     def init_status(temp_dir):
         status = {
@@ -264,62 +580,61 @@ class WorkflowManager:
 
     @staticmethod
     def request_stop(temp_dir):
-        current_status = WorkflowManager.load_status(temp_dir)
-        if current_status:
-            current_status["stop_requested"] = True
-            current_status["is_running"] = False  # 立即标记为停止
-            current_status["logs"].append(f"[{datetime.now().strftime('%H:%M:%S')}] 用户请求中止任务...")
-            WorkflowManager.save_status(temp_dir, current_status)
+        with WorkflowManager._lock:
+            current_status = WorkflowManager._load_locked(temp_dir)
+            if current_status:
+                current_status["stop_requested"] = True
+                current_status["is_running"] = False  # 立即标记为停止
+                _append_status_log(current_status, "用户请求中止任务...")
+                WorkflowManager._flush(temp_dir, current_status)
 
     @staticmethod
     def load_status(temp_dir):
-        file_path = WorkflowManager.get_status_file_path(temp_dir)
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return None
-        return None
+        with WorkflowManager._lock:
+            status = WorkflowManager._load_locked(temp_dir)
+            # 浅拷贝给 UI 轮询用，避免顶层键被调用方改动污染内存态
+            return copy.copy(status) if status is not None else None
 
     @staticmethod
     def save_status(temp_dir, status):
-        file_path = WorkflowManager.get_status_file_path(temp_dir)
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(status, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存状态失败: {e}")
+        with WorkflowManager._lock:
+            WorkflowManager._state[temp_dir] = status
+            WorkflowManager._flush(temp_dir, status)
 
     @staticmethod
     def update_step(temp_dir, step_name, status_code, message=""):
         """
         status_code: pending, running, success, error
         """
-        current_status = WorkflowManager.load_status(temp_dir)
-        if current_status:
-            if step_name in current_status["steps"]:
-                current_status["steps"][step_name]["status"] = status_code
-                current_status["steps"][step_name]["message"] = message
-            current_status["logs"].append(f"[{datetime.now().strftime('%H:%M:%S')}] {step_name}: {status_code} - {message}")
-            WorkflowManager.save_status(temp_dir, current_status)
+        with WorkflowManager._lock:
+            current_status = WorkflowManager._load_locked(temp_dir)
+            if current_status:
+                if step_name in current_status["steps"]:
+                    current_status["steps"][step_name]["status"] = status_code
+                    current_status["steps"][step_name]["message"] = message
+                _append_status_log(current_status, f"{step_name}: {status_code} - {message}")
+                if (status_code in ('success', 'error')
+                        or time.monotonic() - WorkflowManager._last_flush.get(temp_dir, 0.0) > 1.0):
+                    WorkflowManager._flush(temp_dir, current_status)
 
     @staticmethod
     def mark_completed(temp_dir, results=None):
-        current_status = WorkflowManager.load_status(temp_dir)
-        if current_status:
-            current_status["is_running"] = False
-            if results:
-                current_status["results"].update(results)
-            WorkflowManager.save_status(temp_dir, current_status)
+        with WorkflowManager._lock:
+            current_status = WorkflowManager._load_locked(temp_dir)
+            if current_status:
+                current_status["is_running"] = False
+                if results:
+                    current_status["results"].update(results)
+                WorkflowManager._flush(temp_dir, current_status)
 
     @staticmethod
     def mark_error(temp_dir, error_msg):
-        current_status = WorkflowManager.load_status(temp_dir)
-        if current_status:
-            current_status["is_running"] = False
-            current_status["error"] = error_msg
-            WorkflowManager.save_status(temp_dir, current_status)
+        with WorkflowManager._lock:
+            current_status = WorkflowManager._load_locked(temp_dir)
+            if current_status:
+                current_status["is_running"] = False
+                current_status["error"] = error_msg
+                WorkflowManager._flush(temp_dir, current_status)
 
 def background_workflow_task(config):
     """
@@ -367,23 +682,42 @@ def background_workflow_task(config):
                     check_interrupt()
                     time.sleep(2 ** attempt)
 
+        # 一次 yt-dlp 调用同时拿到 字幕+视频+封面+JSON元数据，
+        # 后续步骤直接消费产物，省掉每步 1~2s 的解释器启动和握手；
+        # 单项产物缺失时各步骤仍保留原来的独立调用兜底
+        dl_base = os.path.join(subtitles_dir, "downloaded_video")
+        workflow_info = {}
+
         def dl_sub():
             args = [
                 '--write-auto-sub',
-                '--skip-download',
                 '--sub-langs', 'en',
+                '--write-thumbnail',
+                '--print-json',
                 '--quiet',
-                '-o', os.path.join(subtitles_dir, '%(title)s.%(ext)s'),
+                # 原始音轨会被TTS配音整个替换掉，只下视频流省带宽和合流时间
+                '-f', 'bestvideo[ext=mp4]/best[ext=mp4]/best',
+                '-o', f'{dl_base}.%(ext)s',
+                '-o', 'thumbnail:' + os.path.join(subtitles_dir, 'cover.%(ext)s'),
                 workflow_url
             ]
-            run_yt_dlp_subprocess(args, cookies_file_path)
-            vtt_files = list(Path(subtitles_dir).glob("*.vtt"))
-            if not vtt_files: raise Exception("未找到VTT文件")
-            original_file = vtt_files[0]
+            stdout = run_yt_dlp_subprocess(args, cookies_file_path)
+            try:
+                workflow_info.update(json.loads(stdout.strip().splitlines()[-1]))
+            except Exception as e:
+                print(f"解析 --print-json 输出失败（标题步骤将回退单独获取）: {e}")
+            # 输出模板固定，字幕落在已知路径，正常情况不用扫目录
+            expected = f"{dl_base}.en.vtt"
+            if os.path.exists(expected):
+                original_file = expected
+            else:
+                # scandir 直接后缀过滤，不走 fnmatch 也不构造 Path 对象
+                with os.scandir(subtitles_dir) as it:
+                    vtt_files = [e.path for e in it if e.name.endswith('.vtt') and e.is_file()]
+                if not vtt_files: raise Exception("未找到VTT文件")
+                original_file = vtt_files[0]
             new_file = os.path.join(subtitles_dir, "word_level.vtt")
-            # 如果存在则覆盖
-            if os.path.exists(new_file): os.remove(new_file)
-            os.rename(original_file, new_file)
+            os.replace(original_file, new_file)  # 原子覆盖，免去 exists+remove+rename 三连
             return new_file
 
         vtt_file_path = retry_op(dl_sub)
@@ -394,11 +728,14 @@ def background_workflow_task(config):
         WorkflowManager.update_step(temp_dir, "翻译标题", "running", "正在分析视频信息...")
         
         def trans_title():
-            args = ['--dump-json', '--skip-download', '--quiet', workflow_url]
-            stdout = run_yt_dlp_subprocess(args, cookies_file_path)
-            info_dict = json.loads(stdout)
-            original_title = info_dict.get('title', '')
-            
+            # 元数据已随步骤1的 --print-json 一起拿到，缺失时才单独请求
+            original_title = workflow_info.get('title', '')
+            if not original_title:
+                args = ['--dump-json', '--skip-download', '--quiet', workflow_url]
+                stdout = run_yt_dlp_subprocess(args, cookies_file_path)
+                info_dict = json.loads(stdout)
+                original_title = info_dict.get('title', '')
+
             if not original_title: raise Exception("无法获取标题")
             
             if config.get('use_local_model', False):
@@ -415,34 +752,52 @@ def background_workflow_task(config):
             else:
                 # 调用API翻译
                 headers = {"Authorization": f"Bearer {config['api_key']}", "Content-Type": "application/json"}
-                
-                # 标题翻译
-                payload = {
-                    "model": config['model_name'],
-                    "messages": [
-                        {"role": "system", "content": "你是爆款视频up主，将英文标题翻译成吸引眼球的爆款视频中文标题，直接输出翻译结果，不要解释。"},
-                        {"role": "user", "content": original_title}
-                    ]
-                }
-                resp = requests.post(config['api_url'], json=payload, headers=headers, timeout=60)
-                translated_title = resp.json()['choices'][0]['message']['content'].replace('**', '').strip()
-                
-                # 标签生成
-                tags_payload = {
-                    "model": config['model_name'],
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的B站运营助手"},
-                        {"role": "user", "content": f"根据以下视频标题，生成5-8个B站视频标签（只输出标签，用逗号分隔）：\n标题：{translated_title}\n只输出标签，不要其他内容。"}
-                    ]
-                }
-                tags_resp = requests.post(config['api_url'], json=tags_payload, headers=headers, timeout=60)
-                tags_str = tags_resp.json()['choices'][0]['message']['content']
-                tags_list = [t.strip() for t in tags_str.replace('，', ',').split(',') if t.strip()][:10]
+
+                # 标题+标签合并成一次请求，省一个 LLM 往返；
+                # JSON 解析失败或字段缺失时回退原来的两段式
+                translated_title = None
+                tags_list = []
+                try:
+                    combined_payload = {
+                        "model": config['model_name'],
+                        "messages": [
+                            {"role": "system", "content": TITLE_TAGS_COMBINED_PROMPT},
+                            {"role": "user", "content": original_title}
+                        ],
+                        "response_format": {"type": "json_object"}
+                    }
+                    combined = json.loads(_cached_llm_post(config['api_url'], combined_payload, headers))
+                    if combined.get('title') and combined.get('tags'):
+                        translated_title = str(combined['title']).replace('**', '').strip()
+                        tags_list = [str(t).strip() for t in combined['tags'] if str(t).strip()][:10]
+                except Exception as e:
+                    print(f"标题+标签合并请求失败({e})，回退两段式")
+
+                if not translated_title or not tags_list:
+                    # 标题翻译
+                    payload = {
+                        "model": config['model_name'],
+                        "messages": [
+                            {"role": "system", "content": TITLE_SYSTEM_PROMPT},
+                            {"role": "user", "content": original_title}
+                        ]
+                    }
+                    translated_title = _cached_llm_post(config['api_url'], payload, headers).replace('**', '').strip()
+
+                    # 标签生成
+                    tags_payload = {
+                        "model": config['model_name'],
+                        "messages": [
+                            {"role": "system", "content": TAGS_SYSTEM_PROMPT},
+                            {"role": "user", "content": f"根据以下视频标题，生成5-8个B站视频标签（只输出标签，用逗号分隔）：\n标题：{translated_title}\n只输出标签，不要其他内容。"}
+                        ]
+                    }
+                    tags_str = _cached_llm_post(config['api_url'], tags_payload, headers)
+                    tags_list = [t.strip() for t in tags_str.translate(_TAG_TRANS).split(',') if t.strip()][:10]
             
             # 保存上传配置
             upload_data = {'title_desc': f'(中配){translated_title}', 'tags': tags_list}
-            with open(os.path.join(subtitles_dir, "upload_config.pkl"), 'wb') as f:
-                pickle.dump(upload_data, f)
+            save_upload_config(os.path.join(subtitles_dir, "upload_config.pkl"), upload_data)
                 
             return translated_title, tags_list
             
@@ -542,71 +897,127 @@ def background_workflow_task(config):
         WorkflowManager.update_step(temp_dir, "下载视频", "running", "下载并合并视频...")
         
         def dl_video():
-            dl_base = os.path.join(temp_dir, "subtitles", "downloaded_video")
-            args = [
-                '-f', 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                '-o', f'{dl_base}.%(ext)s',
-                '--quiet',
-                workflow_url
-            ]
-            run_yt_dlp_subprocess(args, cookies_file_path)
-            
-            dl_files = glob.glob(f"{dl_base}.*")
+            # 视频已随步骤1一起下载；产物丢失时才重新下载
+            dl_files = [f for f in find_files_with_prefix(dl_base) if not f.endswith('.vtt')]
+            if not dl_files:
+                args = [
+                    # 原始音轨会被TTS配音整个替换掉，只下视频流省带宽和合流时间
+                    '-f', 'bestvideo[ext=mp4]/best[ext=mp4]/best',
+                    '-o', f'{dl_base}.%(ext)s',
+                    '--quiet',
+                    workflow_url
+                ]
+                run_yt_dlp_subprocess(args, cookies_file_path, capture_stdout=False)
+                dl_files = [f for f in find_files_with_prefix(dl_base) if not f.endswith('.vtt')]
             if not dl_files: raise Exception("视频文件未找到")
-            
+
             raw_video = dl_files[0]
             final_vid = os.path.splitext(mp3_file_path)[0] + ".mp4"
-            
-            subprocess.run(['ffmpeg', '-y', '-i', raw_video, '-i', mp3_file_path,
-                           '-c:v', 'copy', '-c:a', 'aac', '-map', '0:v:0', '-map', '1:a:0',
-                           final_vid], check=True, capture_output=True)
-            
-            if os.path.exists(raw_video): os.remove(raw_video)
-            return final_vid
-            
-        final_video_path = retry_op(dl_video)
-        WorkflowManager.update_step(temp_dir, "下载视频", "success", f"最终视频: {os.path.basename(final_video_path)}")
+
+            def do_mux():
+                aac_audio = ensure_aac_audio(mp3_file_path)
+                if aac_audio:
+                    audio_in, audio_args = aac_audio, ['-c:a', 'copy']
+                else:
+                    audio_in, audio_args = mp3_file_path, ['-c:a', 'aac', '-b:a', '128k', '-aac_coder', 'fast']
+                run_ffmpeg(['-y', '-i', raw_video, '-i', audio_in, '-c:v', 'copy'] + audio_args +
+                           ['-threads', '0', '-movflags', '+faststart',
+                            '-map', '0:v:0', '-map', '1:a:0',
+                            final_vid])
+                if os.path.exists(raw_video): os.remove(raw_video)
+
+            # 合并是 CPU 活、下载/封面是网络活：把 ffmpeg 丢到后台线程，
+            # 让封面处理（批量模式下还有下一个视频的下载）与之重叠，
+            # 上传前再 join 拿结果
+            mux_future = ThreadPoolExecutor(max_workers=1).submit(do_mux)
+            return final_vid, mux_future
+
+        final_video_path, mux_future = retry_op(dl_video)
+        WorkflowManager.update_step(temp_dir, "下载视频", "success", f"后台合并中: {os.path.basename(final_video_path)}")
         
         # --- 步骤6: 处理封面 ---
         check_interrupt()
         WorkflowManager.update_step(temp_dir, "处理封面", "running", "优化封面图片...")
         
         def proc_cover():
-            args = [
-                '--skip-download',
-                '--write-thumbnail',
-                '--quiet',
-                '-o', os.path.join(temp_dir, "subtitles", 'cover.%(ext)s'),
-                workflow_url
-            ]
-            run_yt_dlp_subprocess(args, cookies_file_path)
-            
-            # 寻找封面文件
-            cover_candidates = list(Path(os.path.join(temp_dir, "subtitles")).glob("cover.*"))
-            # 排除已经是jpeg的防止重复处理
-            src_cover = None
-            for c in cover_candidates:
-                if c.suffix.lower() in ['.webp', '.jpg', '.png']:
-                    src_cover = c
-                    break
-            
+            # 输出模板固定为 cover.%(ext)s，直接探测几个已知扩展名即可，
+            # 不用 glob 扫整个目录；排除已是 jpeg 的防止重复处理
+            def find_cover():
+                for ext in ('.webp', '.jpg', '.png'):
+                    cand = os.path.join(temp_dir, "subtitles", 'cover' + ext)
+                    if os.path.exists(cand):
+                        return cand
+                return None
+
+            # 封面已随步骤1的 --write-thumbnail 一起下载，找不到时才单独请求
+            src_cover = find_cover()
+            if not src_cover:
+                args = [
+                    '--skip-download',
+                    '--write-thumbnail',
+                    '--quiet',
+                    '-o', os.path.join(temp_dir, "subtitles", 'cover.%(ext)s'),
+                    workflow_url
+                ]
+                run_yt_dlp_subprocess(args, cookies_file_path, capture_stdout=False)
+                src_cover = find_cover()
+
             if not src_cover: raise Exception("未找到封面文件")
             
             out_cover = os.path.join(temp_dir, "subtitles", "cover.jpeg")
-            qual = 90
+
+            # 快速路径：与 tab5 相同，先让 ffmpeg(libjpeg-turbo) 原生转码，
+            # 最多试两档质量；不可用或仍超限再退回 Pillow 的二分搜索
+            try:
+                for q in ('5', '15'):
+                    subprocess.run(['ffmpeg', '-y', '-i', src_cover, '-q:v', q, out_cover],
+                                   check=True, capture_output=True)
+                    if os.path.getsize(out_cover) <= 50 * 1024:
+                        return out_cover
+            except Exception:
+                pass
+
             with Image.open(src_cover) as img:
+                # 先把像素量压到 1280x720 以内再调质量：4K 封面的体积
+                # 主要由分辨率决定，降采样后二分通常一两轮就收敛
+                img.draft('RGB', (1280, 720))
+                img.thumbnail((1280, 720), Image.Resampling.LANCZOS)
                 if img.mode != 'RGB': img = img.convert('RGB')
-                img.save(out_cover, 'jpeg', quality=qual)
-                
-                # 压缩到合适大小
-                while os.path.getsize(out_cover) / 1024 > 50 and qual > 10:
-                    qual -= 5
-                    img.save(out_cover, 'jpeg', quality=qual)
+                img.load()
+
+                # 在 [10, 90] 上二分质量找 <=50KB 的最高质量：
+                # 原来的 -5 步进最多重编码 17 次，二分最多 7 次，
+                # 且编码进内存缓冲，只在最后落盘一次
+                best_buf = None
+                buf = None
+                lo, hi = 10, 90
+                while lo <= hi:
+                    mid = (lo + hi) // 2
+                    buf = BytesIO()
+                    img.save(buf, 'jpeg', quality=mid, optimize=False, progressive=False,
+                             subsampling=2)  # 4:2:0，封面图肉眼无差但小 ~40%
+                    if buf.tell() <= 50 * 1024:
+                        best_buf = buf
+                        lo = mid + 1
+                    else:
+                        hi = mid - 1
+                if best_buf is None:
+                    best_buf = buf  # 最低质量也超限时保留最后一版
+            with open(out_cover, 'wb') as f:
+                f.write(best_buf.getvalue())
             return out_cover
 
         cover_path = retry_op(proc_cover)
         WorkflowManager.update_step(temp_dir, "处理封面", "success", "封面处理完成")
-        
+
+        # 封面处理已与后台合并重叠；上传前 join，失败记到"下载视频"步骤
+        try:
+            mux_future.result()
+        except Exception as e:
+            WorkflowManager.update_step(temp_dir, "下载视频", "error", f"音视频合并失败: {e}")
+            raise
+        WorkflowManager.update_step(temp_dir, "下载视频", "success", f"最终视频: {os.path.basename(final_video_path)}")
+
         results = {
             "vtt": vtt_file_path,
             "txt": txt_file_path,
@@ -644,10 +1055,11 @@ def background_workflow_task(config):
                     total_chunks = 0
                     uploaded_chunks = 0
                     last_percent = 0
-                    
+                    last_progress_ts = 0.0
+
                     @uploader.on("__ALL__")
                     async def on_all_event(event_data):
-                        nonlocal total_chunks, uploaded_chunks, last_percent
+                        nonlocal total_chunks, uploaded_chunks, last_percent, last_progress_ts
                         
                         # 检查中断
                         check_interrupt()
@@ -675,10 +1087,13 @@ def background_workflow_task(config):
                             uploaded_chunks += 1
                             chunk_num = data.get("chunk_number", 0)
                             percent = int((uploaded_chunks / total_chunks) * 100) if total_chunks > 0 else 0
-                            if percent - last_percent >= 5:
+                            # 百分比和时间双重闸门：大文件分块多时 5% 也可能一秒内跨过好几次
+                            now = time.monotonic()
+                            if percent - last_percent >= 5 and now - last_progress_ts >= 2:
                                 print(f"[上传] 事件 AFTER_CHUNK - 分块 {chunk_num} 上传完成, 进度 {percent}%", flush=True)
                                 WorkflowManager.update_step(temp_dir, "上传B站", "running", f"上传中... {percent}%")
                                 last_percent = percent
+                                last_progress_ts = now
                         elif event_name == "CHUNK_FAILED":
                             print(f"[上传] 事件 CHUNK_FAILED - 分块上传失败: {data}", flush=True)
                         elif event_name == "PRE_PAGE_SUBMIT":
@@ -726,23 +1141,16 @@ def background_workflow_task(config):
                 except Exception as e:
                     upload_error = str(e)
                     print(f"[上传] 异常错误: {upload_error}", flush=True)
-                    import traceback
                     traceback.print_exc()
             
-            # 在新事件循环运行
-            print(f"[上传] 创建新的事件循环", flush=True)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            # asyncio.run 自建并善后事件循环，省掉 new_event_loop/close 样板
+            print(f"[上传] 启动上传事件循环", flush=True)
             try:
-                loop.run_until_complete(upload_task())
+                asyncio.run(upload_task())
                 print(f"[上传] 事件循环执行完毕", flush=True)
             except Exception as e:
                 print(f"[上传] 事件循环异常: {e}", flush=True)
-                import traceback
                 traceback.print_exc()
-            finally:
-                loop.close()
-                print(f"[上传] 事件循环已关闭", flush=True)
             
             # 检查上传结果
             if upload_error:
@@ -765,7 +1173,6 @@ def background_workflow_task(config):
         WorkflowManager.mark_completed(temp_dir, results)
 
     except Exception as e:
-        import traceback
         err_msg = f"{str(e)}"
         if str(e) != "用户手动中止任务":
             err_msg += f"\n{traceback.format_exc()}"
@@ -776,6 +1183,13 @@ def background_workflow_task(config):
 BATCH_STATUS_FILE = "batch_status.json"
 
 class BatchWorkflowManager:
+    # 与 WorkflowManager 相同：状态文件为真相源，内存 dict 按 mtime 失效，
+    # 过程性更新节流落盘，终态立即落盘
+    _state = {}
+    _state_mtime = {}
+    _last_flush = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def get_batch_dir(base_dir):
         return os.path.join(base_dir, "batch_workspace")
@@ -785,6 +1199,45 @@ class BatchWorkflowManager:
         batch_dir = BatchWorkflowManager.get_batch_dir(base_dir)
         return os.path.join(batch_dir, BATCH_STATUS_FILE)
 
+    @staticmethod
+    def _load_locked(base_dir):
+        file_path = BatchWorkflowManager.get_status_file_path(base_dir)
+        try:
+            disk_mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            disk_mtime = None
+        status = BatchWorkflowManager._state.get(base_dir)
+        stale = (disk_mtime is not None
+                 and disk_mtime > BatchWorkflowManager._state_mtime.get(base_dir, -1))
+        if (status is None or stale) and disk_mtime is not None:
+            try:
+                with open(file_path, 'rb') as f:
+                    fresh = _loads_status(f.read())
+            except Exception:
+                fresh = None
+            if fresh is not None:
+                status = fresh
+                BatchWorkflowManager._state[base_dir] = fresh
+                BatchWorkflowManager._state_mtime[base_dir] = disk_mtime
+        return status
+
+    @staticmethod
+    def _flush(base_dir, status):
+        file_path = BatchWorkflowManager.get_status_file_path(base_dir)
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_dumps_status(status))
+            os.replace(tmp_path, file_path)
+            BatchWorkflowManager._last_flush[base_dir] = time.monotonic()
+            try:
+                BatchWorkflowManager._state_mtime[base_dir] = os.stat(file_path).st_mtime_ns
+            except OSError:
+                pass
+        except Exception as e:
+            print(f"保存批量状态失败: {e}")
+
     @staticmethod
     def init_status(base_dir, urls):
         batch_dir = BatchWorkflowManager.get_batch_dir(base_dir)
@@ -802,6 +1255,7 @@ class BatchWorkflowManager:
             "stop_requested": False,
             "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "start_timestamp": datetime.now().isoformat(),
+            "start_epoch": time.time(),
             "total_videos": len(urls),
             "current_index": -1,
             "video_results": video_results,
@@ -814,51 +1268,54 @@ class BatchWorkflowManager:
 
     @staticmethod
     def request_stop(base_dir):
-        current = BatchWorkflowManager.load_status(base_dir)
-        if current:
-            current["stop_requested"] = True
-            current["is_running"] = False
-            current["logs"].append(f"[{datetime.now().strftime('%H:%M:%S')}] 用户请求中止批量任务...")
-            BatchWorkflowManager.save_status(base_dir, current)
+        with BatchWorkflowManager._lock:
+            current = BatchWorkflowManager._load_locked(base_dir)
+            if current:
+                current["stop_requested"] = True
+                current["is_running"] = False
+                _append_status_log(current, "用户请求中止批量任务...")
+                BatchWorkflowManager._flush(base_dir, current)
 
     @staticmethod
     def load_status(base_dir):
-        file_path = BatchWorkflowManager.get_status_file_path(base_dir)
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return None
-        return None
+        with BatchWorkflowManager._lock:
+            status = BatchWorkflowManager._load_locked(base_dir)
+            return copy.copy(status) if status is not None else None
 
     @staticmethod
     def save_status(base_dir, status):
-        file_path = BatchWorkflowManager.get_status_file_path(base_dir)
-        try:
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(status, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存批量状态失败: {e}")
+        with BatchWorkflowManager._lock:
+            BatchWorkflowManager._state[base_dir] = status
+            BatchWorkflowManager._flush(base_dir, status)
 
     @staticmethod
     def update_video(base_dir, index, status_code, message=""):
-        current = BatchWorkflowManager.load_status(base_dir)
-        if current and 0 <= index < len(current["video_results"]):
-            current["video_results"][index]["status"] = status_code
-            current["video_results"][index]["message"] = message
-            current["current_index"] = index
-            current["logs"].append(f"[{datetime.now().strftime('%H:%M:%S')}] 视频 {index+1}: {status_code} - {message}")
-            BatchWorkflowManager.save_status(base_dir, current)
+        with BatchWorkflowManager._lock:
+            current = BatchWorkflowManager._load_locked(base_dir)
+            if current and 0 <= index < len(current["video_results"]):
+                current["video_results"][index]["status"] = status_code
+                current["video_results"][index]["message"] = message
+                current["current_index"] = index
+                _append_status_log(current, f"视频 {index+1}: {status_code} - {message}")
+                if (status_code in ('success', 'error')
+                        or time.monotonic() - BatchWorkflowManager._last_flush.get(base_dir, 0.0) > 1.0):
+                    BatchWorkflowManager._flush(base_dir, current)
 
     @staticmethod
     def _calc_elapsed(current):
-        """根据 start_timestamp 计算已用时间的可读字符串"""
+        """根据 start_epoch 计算已用时间的可读字符串
+
+        init_status 时顺手存了 epoch 浮点数，这里只做一次减法，
+        不用每次都 fromisoformat 重新解析再构造 timedelta；
+        旧版状态文件没有 start_epoch 时退回解析 start_timestamp
+        """
         try:
-            start = datetime.fromisoformat(current.get("start_timestamp", ""))
-            delta = datetime.now() - start
-            total_secs = int(delta.total_seconds())
+            start_epoch = current.get("start_epoch")
+            if start_epoch is not None:
+                total_secs = int(time.time() - start_epoch)
+            else:
+                start = datetime.fromisoformat(current.get("start_timestamp", ""))
+                total_secs = int((datetime.now() - start).total_seconds())
             hours, remainder = divmod(total_secs, 3600)
             mins, secs = divmod(remainder, 60)
             if hours > 0:
@@ -872,22 +1329,24 @@ class BatchWorkflowManager:
 
     @staticmethod
     def mark_completed(base_dir):
-        current = BatchWorkflowManager.load_status(base_dir)
-        if current:
-            current["is_running"] = False
-            elapsed = BatchWorkflowManager._calc_elapsed(current)
-            current["elapsed_time"] = elapsed
-            current["logs"].append(f"[{datetime.now().strftime('%H:%M:%S')}] 批量任务全部完成，总用时: {elapsed}")
-            BatchWorkflowManager.save_status(base_dir, current)
+        with BatchWorkflowManager._lock:
+            current = BatchWorkflowManager._load_locked(base_dir)
+            if current:
+                current["is_running"] = False
+                elapsed = BatchWorkflowManager._calc_elapsed(current)
+                current["elapsed_time"] = elapsed
+                _append_status_log(current, f"批量任务全部完成，总用时: {elapsed}")
+                BatchWorkflowManager._flush(base_dir, current)
 
     @staticmethod
     def mark_error(base_dir, error_msg):
-        current = BatchWorkflowManager.load_status(base_dir)
-        if current:
-            current["is_running"] = False
-            current["error"] = error_msg
-            current["elapsed_time"] = BatchWorkflowManager._calc_elapsed(current)
-            BatchWorkflowManager.save_status(base_dir, current)
+        with BatchWorkflowManager._lock:
+            current = BatchWorkflowManager._load_locked(base_dir)
+            if current:
+                current["is_running"] = False
+                current["error"] = error_msg
+                current["elapsed_time"] = BatchWorkflowManager._calc_elapsed(current)
+                BatchWorkflowManager._flush(base_dir, current)
 
 
 def background_batch_workflow_task(batch_config):
@@ -904,87 +1363,105 @@ def background_batch_workflow_task(batch_config):
     urls = [item['url'] for item in items]
     BatchWorkflowManager.init_status(base_dir, urls)
     batch_dir = BatchWorkflowManager.get_batch_dir(base_dir)
+    # 单视频流水线大头是网络等待（下载/API/上传），适度并发能近线性提速
+    concurrency = max(1, int(batch_config.get('concurrency', 1) or 1))
+
+    def process_one(i, item):
+        """处理批量中的单个视频，返回 False 表示用户已请求中止"""
+        url = item['url']
+        voice = item.get('voice', default_voice)
+
+        # 检查中止
+        bs = BatchWorkflowManager.load_status(base_dir)
+        if bs and bs.get("stop_requested", False):
+            BatchWorkflowManager.update_video(base_dir, i, "error", "用户中止")
+            return False
+
+        BatchWorkflowManager.update_video(base_dir, i, "running", f"正在处理... (配音: {voice})")
+
+        # 为每个视频创建独立临时目录
+        video_temp_dir = os.path.join(batch_dir, f"video_{i}")
+        os.makedirs(video_temp_dir, exist_ok=True)
+
+        # 构建单视频配置（复用 background_workflow_task）
+        single_config = {
+            "temp_dir": video_temp_dir,
+            "workflow_url": url.strip(),
+            "auto_upload": auto_upload,
+            "api_url": batch_config['api_url'],
+            "api_key": batch_config['api_key'],
+            "model_name": batch_config['model_name'],
+            "bili_sess": batch_config['bili_sess'],
+            "bili_jct": batch_config.get('bili_jct', ''),
+            "bili_ak": batch_config.get('bili_ak', ''),
+            "bili_sk": batch_config.get('bili_sk', ''),
+            "yt_cookies": batch_config.get('yt_cookies', ''),
+            "voice_choice": voice,
+            "max_workers": batch_config['max_workers'],
+            "segment_size": batch_config['segment_size'],
+            "use_local_model": batch_config.get('use_local_model', False),
+            "local_model_repo": batch_config.get('local_model_repo', ''),
+            "local_model_file": batch_config.get('local_model_file', ''),
+            "local_gpu_layers": batch_config.get('local_gpu_layers', -1),
+            "local_n_ctx": batch_config.get('local_n_ctx', 8192),
+            "local_chunk_size": batch_config.get('local_chunk_size', 10),
+            "local_terminology": batch_config.get('local_terminology', '')
+        }
 
-    try:
-        for i, item in enumerate(items):
-            url = item['url']
-            voice = item.get('voice', default_voice)
-
-            # 检查中止
-            bs = BatchWorkflowManager.load_status(base_dir)
-            if bs and bs.get("stop_requested", False):
-                BatchWorkflowManager.update_video(base_dir, i, "error", "用户中止")
-                break
-
-            BatchWorkflowManager.update_video(base_dir, i, "running", f"正在处理... (配音: {voice})")
-
-            # 为每个视频创建独立临时目录
-            video_temp_dir = os.path.join(batch_dir, f"video_{i}")
-            os.makedirs(video_temp_dir, exist_ok=True)
-
-            # 构建单视频配置（复用 background_workflow_task）
-            single_config = {
-                "temp_dir": video_temp_dir,
-                "workflow_url": url.strip(),
-                "auto_upload": auto_upload,
-                "api_url": batch_config['api_url'],
-                "api_key": batch_config['api_key'],
-                "model_name": batch_config['model_name'],
-                "bili_sess": batch_config['bili_sess'],
-                "bili_jct": batch_config.get('bili_jct', ''),
-                "bili_ak": batch_config.get('bili_ak', ''),
-                "bili_sk": batch_config.get('bili_sk', ''),
-                "yt_cookies": batch_config.get('yt_cookies', ''),
-                "voice_choice": voice,
-                "max_workers": batch_config['max_workers'],
-                "segment_size": batch_config['segment_size'],
-                "use_local_model": batch_config.get('use_local_model', False),
-                "local_model_repo": batch_config.get('local_model_repo', ''),
-                "local_model_file": batch_config.get('local_model_file', ''),
-                "local_gpu_layers": batch_config.get('local_gpu_layers', -1),
-                "local_n_ctx": batch_config.get('local_n_ctx', 8192),
-                "local_chunk_size": batch_config.get('local_chunk_size', 10),
-                "local_terminology": batch_config.get('local_terminology', '')
-            }
+        try:
+            background_workflow_task(single_config)
+            # 检查单视频的执行结果
+            single_status = WorkflowManager.load_status(video_temp_dir)
+            if single_status and single_status.get("error"):
+                BatchWorkflowManager.update_video(base_dir, i, "error", single_status["error"])
+            else:
+                BatchWorkflowManager.update_video(base_dir, i, "success", "处理完成")
+        except Exception as e:
+            BatchWorkflowManager.update_video(base_dir, i, "error", str(e))
+            print(f"批量任务 - 视频 {i+1} 出错: {e}")
+            # 单视频失败不中断整个批量任务
+        return True
 
-            try:
-                background_workflow_task(single_config)
-                # 检查单视频的执行结果
-                single_status = WorkflowManager.load_status(video_temp_dir)
-                if single_status and single_status.get("error"):
-                    BatchWorkflowManager.update_video(base_dir, i, "error", single_status["error"])
-                else:
-                    BatchWorkflowManager.update_video(base_dir, i, "success", "处理完成")
-            except Exception as e:
-                BatchWorkflowManager.update_video(base_dir, i, "error", str(e))
-                print(f"批量任务 - 视频 {i+1} 出错: {e}")
-                # 继续处理下一个视频，不中断整个批量任务
-                continue
+    try:
+        if concurrency > 1:
+            # N 路并发：线程池限流，同步流水线本身不动，
+            # 各视频在自己的线程里重叠网络等待。
+            # 运行环境钉在 Python 3.10（runtime.txt / Dockerfile），
+            # 没有 asyncio.TaskGroup，线程池也正好贴合 process_one 的同步实现；
+            # 中止请求由每个 process_one 开头的 stop_requested 检查消化
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(process_one, i, item)
+                           for i, item in enumerate(items)]
+                for future in futures:
+                    future.result()
+        else:
+            for i, item in enumerate(items):
+                if not process_one(i, item):
+                    break
 
         BatchWorkflowManager.mark_completed(base_dir)
 
     except Exception as e:
-        import traceback
         full_err = f"{e}\n{traceback.format_exc()}"
         print(f"批量任务出错: {full_err}")
         BatchWorkflowManager.mark_error(base_dir, full_err)
 
 def clear_temp_directory():
     """清空temp目录下的所有内容"""
-    import shutil
     try:
-        if os.path.exists(TEMP_DIR):
-            for filename in os.listdir(TEMP_DIR):
-                file_path = os.path.join(TEMP_DIR, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    print(f'清空temp目录时出错 {file_path}: {e}')
+        # scandir 的 DirEntry 自带类型信息，不用再对每个条目补 stat
+        try:
+            with os.scandir(TEMP_DIR) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                            os.unlink(entry.path)
+                        elif entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.path)
+                    except Exception as e:
+                        print(f'清空temp目录时出错 {entry.path}: {e}')
             print("temp目录已清空")
-        else:
+        except FileNotFoundError:
             os.makedirs(TEMP_DIR, exist_ok=True)
             print("temp目录已创建")
     except Exception as e:
@@ -995,6 +1472,13 @@ def clear_temp_directory():
 # 时间戳行正则：以 (HH:MM:SS.mmm) 开头且后接非空白字符
 _TIMESTAMP_LINE_RE = re.compile(r'^\(\d{2}:\d{2}:\d{2}\.\d{3}\)\s*\S')
 
+# 译文清洗：多字符噪点用一个预编译的 alternation 一次替换，
+# 单字符噪点用 str.translate 的映射表处理，避免链式 replace 反复扫描整串
+_CLEAN_RE = re.compile(r'&gt;|>>|&trash;|&nbsp;|\[音乐\]|> ')
+_CLEAN_TRANS = str.maketrans({'_': '', '＞': ''})
+# 全角逗号归一化：translate 单遍完成，省掉 replace 的整串拷贝
+_TAG_TRANS = str.maketrans({'，': ','})
+
 # 在线API翻译系统提示词（强调行数对应、不得截断）
 TRANSLATE_SYSTEM_PROMPT = (
     "# Role: 专业字幕翻译官\n\n"
@@ -1013,6 +1497,19 @@ TRANSLATE_SYSTEM_PROMPT = (
     "输出：(00:00:01.000) 你好，欢迎来到我的频道。"
 )
 
+# system 消息 dict 只建一份，各批次 payload 引用同一对象即可：
+# payload 每次新建，但 1.5KB 的提示词不再随每个分段重复构造消息结构
+_TRANSLATE_SYSTEM_MSG = {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT}
+
+# 标题/标签提示词（workflow 与 tab1 共用，集中定义避免两处文案漂移）
+TITLE_TAGS_COMBINED_PROMPT = (
+    "你是爆款视频up主兼B站运营助手。把用户提供的英文标题翻译成吸引眼球的爆款中文标题，"
+    "并为其生成5-8个B站视频标签。只输出JSON对象："
+    "{\"title\": \"中文标题\", \"tags\": [\"标签1\", \"标签2\"]}，不要解释。"
+)
+TITLE_SYSTEM_PROMPT = "你是爆款视频up主，将英文标题翻译成吸引眼球的爆款视频中文标题，直接输出翻译结果，不要解释。"
+TAGS_SYSTEM_PROMPT = "你是一个专业的B站运营助手"
+
 
 def validate_and_clean_translation(translated_content, original_batch, batch_index=0):
     """校验并清洗在线API的翻译结果。
@@ -1111,7 +1608,7 @@ def _translate_with_local_llm(batch_text):
         with _LLM_INFER_LOCK:
             resp = llm.create_chat_completion(
                 messages=[
-                    {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+                    _TRANSLATE_SYSTEM_MSG,
                     {"role": "user", "content": batch_text},
                 ],
                 max_tokens=4000,
@@ -1125,7 +1622,7 @@ def _translate_with_local_llm(batch_text):
 
     if not content:
         return None
-    content = content.replace('&gt;', '').replace('>>', '').replace('& trash;', '').replace('[音乐]', '').replace('[笑声]', '')
+    content = _CLEANUP_RE.sub('', content)
     cleaned, is_valid, error_msg = validate_and_clean_translation(content, batch_text)
     if is_valid:
         return cleaned
@@ -1133,105 +1630,251 @@ def _translate_with_local_llm(batch_text):
     return None
 
 
-def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
-    """从VTT文件翻译字幕，生成带时间戳的文本文件（单步执行的完整逻辑）"""
-    # 获取配置，如果未提供则使用全局变量
-    cfg_api_url = api_config.get("API_URL", API_URL) if api_config else API_URL
-    cfg_api_key = api_config.get("API_KEY", API_KEY) if api_config else API_KEY
-    cfg_model = api_config.get("MODEL_NAME", MODEL_NAME) if api_config else MODEL_NAME
-    cfg_max_workers = api_config.get("MAX_WORKERS", MAX_WORKERS) if api_config else MAX_WORKERS
-    cfg_seg_size = api_config.get("SEGMENT_SIZE", SEGMENT_SIZE) if api_config else SEGMENT_SIZE
+# VTT 解析用的正则，编译一次供 vtt_to_sentences 复用
+# 正则：cue 头（起止时间）
+_VTT_CUE_HEADER_RE = re.compile(
+    r'^(\d{2}:\d{2}:\d{2}\.\d{3})\s*--> (\d{2}:\d{2}:\d{2}\.\d{3})'
+)
+# 正则：逐词时间戳 <HH:MM:SS.mmm>
+_VTT_TS_TAG_RE = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>')
+# 正则：清理 <c> 或 <c.xxx> 样式标签
+_VTT_C_TAG_RE = re.compile(r'</?c(?:\.[^>]*)?>', re.IGNORECASE)
+# 组合 token 正则：一趟 finditer 依次吐出 时间戳 / <c>标签(丢弃) / 词，
+# 替代"先 sub 掉 c 标签、再按时间戳切片、再 split"的三遍扫描
+_VTT_TOKEN_RE = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>|</?[cC](?:\.[^>]*)?>|([^<\s]+)')
+# flush_sentence 里的标点收紧规则
+_WS_BEFORE_PUNCT_RE = re.compile(r"\s+([,.;!?])")
+_PAREN_OPEN_WS_RE = re.compile(r"\(\s+")
+_PAREN_CLOSE_WS_RE = re.compile(r"\s+\)")
+# 句末标点用 frozenset 查末字符，单次哈希即可；行首尾剥 BOM/换行的串提成常量
+_SENTENCE_END_SET = frozenset('.!?')
+_VTT_LINE_STRIP = "\ufeff\r\n"
+
+# 译文里不需要朗读的符号/标记，一趟正则扫完，不再串联五次 str.replace
+_CLEANUP_RE = re.compile(r'&gt;|>>|& trash;|\[音乐\]|\[笑声\]')
+
+# 翻译结果缓存：广告口播、片头片尾等内容在长视频里经常逐字重复，
+# 以内容哈希为键复用已有译文，省掉重复的 API 调用；
+# 落盘到 TEMP_DIR 下的 JSON，重复处理同一视频时跨重启也能命中
+_TRANSLATE_CACHE = {}
+_TRANSLATE_CACHE_LOCK = threading.Lock()
+_TRANSLATE_CACHE_MAX = 512
+_translate_cache_loaded = False
+
+
+def _translate_cache_file():
+    return os.path.join(TEMP_DIR, "translate_cache.json")
+
+
+def _translate_cache_key(batch, api_url, model):
+    # 把接口和模型一并编进键里，换模型后不会串用旧译文
+    raw = f"{api_url}|{model}|{batch}".encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _translate_cache_get(key):
+    global _translate_cache_loaded
+    with _TRANSLATE_CACHE_LOCK:
+        if not _translate_cache_loaded:
+            _translate_cache_loaded = True
+            try:
+                with open(_translate_cache_file(), 'rb') as f:
+                    data = _loads_status(f.read())
+                if isinstance(data, dict):
+                    _TRANSLATE_CACHE.update(data)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"加载翻译缓存失败: {e}")
+        return _TRANSLATE_CACHE.get(key)
 
-    cfg_use_local = api_config.get("use_local_model", False) if api_config else False
-    cfg_local_repo = api_config.get("local_model_repo", "tencent/Hy-MT2-1.8B-GGUF") if api_config else "tencent/Hy-MT2-1.8B-GGUF"
-    cfg_local_file = api_config.get("local_model_file", "Hy-MT2-1.8B-Q4_K_M.gguf") if api_config else "Hy-MT2-1.8B-Q4_K_M.gguf"
-    cfg_local_gpu = api_config.get("local_gpu_layers", -1) if api_config else -1
-    cfg_local_ctx = api_config.get("local_n_ctx", 8192) if api_config else 8192
-    cfg_local_chunk_size = api_config.get("local_chunk_size", 10) if api_config else 10
-    cfg_local_term = api_config.get("local_terminology", "") if api_config else ""
 
-    def vtt_to_sentences(vtt_text):
-        """将带逐词时间戳的VTT转换为按句分段的文本"""
-        # 正则：cue 头（起止时间）
-        CUE_HEADER_RE = re.compile(
-            r'^(\d{2}:\d{2}:\d{2}\.\d{3})\s*--> (\d{2}:\d{2}:\d{2}\.\d{3})'
-        )
+def _translate_cache_put(key, value):
+    with _TRANSLATE_CACHE_LOCK:
+        _TRANSLATE_CACHE[key] = value
+        # 粗略的容量控制：超限时淘汰最早放进来的一半
+        if len(_TRANSLATE_CACHE) > _TRANSLATE_CACHE_MAX:
+            for k in list(_TRANSLATE_CACHE)[:_TRANSLATE_CACHE_MAX // 2]:
+                del _TRANSLATE_CACHE[k]
 
-        # 正则：逐词时间戳 <HH:MM:SS.mmm>
-        TS_TAG_RE = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>')
 
-        # 正则：清理 <c> 或 <c.xxx> 样式标签
-        C_TAG_RE = re.compile(r'</?c(?:\.[^>]*)?>', re.IGNORECASE)
+def _translate_cache_save():
+    with _TRANSLATE_CACHE_LOCK:
+        try:
+            path = _translate_cache_file()
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_dumps_status(_TRANSLATE_CACHE))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"保存翻译缓存失败: {e}")
+
 
-        SENTENCE_END = ".!?"
+_translate_cache_last_save = 0.0
 
-        lines = vtt_text.splitlines()
-        sentences = []
+def _translate_cache_save_throttled(min_interval=5.0):
+    """分段成功后的增量落盘，最多每 min_interval 秒写一次。
+
+    进程崩溃或脚本中途重跑时，已付费的分段结果不至于只活在内存里、
+    下次全部重新计费；节流是为了不让上百个分段每个都重写整份缓存文件，
+    整批结束后照旧有一次无条件的 _translate_cache_save 兜底。
+    """
+    global _translate_cache_last_save
+    now = time.monotonic()
+    if now - _translate_cache_last_save < min_interval:
+        return
+    _translate_cache_last_save = now
+    _translate_cache_save()
+
+
+def _cached_llm_post(api_url, payload, headers, timeout=60):
+    """按 (接口, 完整payload) 精确缓存 LLM 回复文本。
+
+    标题翻译、标签生成这类调用是 (model, prompt, 输入) 的纯函数，
+    重跑同一视频时直接复用上次回复；存储与落盘复用字幕翻译缓存。
+    """
+    key = _translate_cache_key(json.dumps(payload, sort_keys=True, ensure_ascii=False), api_url, 'llm')
+    cached = _translate_cache_get(key)
+    if cached:
+        print("调试信息：LLM请求命中缓存，跳过API调用")
+        return cached
+    content = _post_llm(api_url, payload, headers, timeout)['choices'][0]['message']['content']
+    if content:
+        _translate_cache_put(key, content)
+        _translate_cache_save()
+    return content
+
+
+def vtt_to_sentences(vtt_lines):
+    """将带逐词时间戳的VTT转换为按句分段的文本（生成器）。
+
+    vtt_lines 可以是任意行迭代器（通常直接传文件句柄），
+    逐行消费、逐句产出：调用方可以边解析边写盘，
+    输入文件和句子列表都不必整个驻留内存
+    """
+    ready = []  # flush_sentence 的暂存区，每行处理完由主循环吐出
+    current_words = []
+    current_sentence_start_time = None
+
+    effective_time = None
+    cue_start_time = None
+
+    def flush_sentence():
+        nonlocal current_words, current_sentence_start_time
+        if not current_words:
+            return
+        text = " ".join(current_words)
+        # 分词来自 [^<\s]+，文本里的空白只有 join 出来的单个空格，
+        # 大多数句子既无括号也无悬空标点，先用 in 扫一遍再决定跑不跑正则
+        if "(" in text or ")" in text:
+            text = _WS_BEFORE_PUNCT_RE.sub(r"\1", text)
+            text = _PAREN_OPEN_WS_RE.sub("(", text)
+            text = _PAREN_CLOSE_WS_RE.sub(")", text)
+        elif (" ," in text or " ." in text or " ;" in text
+                or " !" in text or " ?" in text):
+            text = _WS_BEFORE_PUNCT_RE.sub(r"\1", text)
+        start_ts = current_sentence_start_time or cue_start_time or effective_time or "00:00:00.000"
+        ready.append(f"({start_ts}) {text}")
         current_words = []
         current_sentence_start_time = None
 
-        effective_time = None
-        cue_start_time = None
-
-        def flush_sentence():
-            nonlocal current_words, current_sentence_start_time
-            if not current_words:
-                return
-            text = " ".join(current_words)
-            text = re.sub(r"\s+([,.;!?])", r"\1", text)
-            text = re.sub(r"\(\s+", "(", text)
-            text = re.sub(r"\s+\)", ")", text)
-            start_ts = current_sentence_start_time or cue_start_time or effective_time or "00:00:00.000"
-            sentences.append(f"({start_ts}) {text}")
-            current_words = []
-            current_sentence_start_time = None
-
-        for line in lines:
-            line = line.strip("\ufeff\r\n")
-
-            # cue 头
-            m = CUE_HEADER_RE.match(line)
-            if m:
-                cue_start_time = m.group(1)
-                effective_time = cue_start_time
-                continue
+    def consume_word(word):
+        nonlocal current_sentence_start_time
+        # 记录首词时间
+        if current_sentence_start_time is None:
+            current_sentence_start_time = effective_time or cue_start_time
 
-            # 只处理含逐词时间戳的行
-            if not TS_TAG_RE.search(line):
-                continue
+        current_words.append(word)
 
-            # 清理 <c> 标签，并把 <timestamp> 变成 [[TS:...]] 哨兵
-            s = C_TAG_RE.sub("", line)
-            s = TS_TAG_RE.sub(lambda mm: f" [[TS:{mm.group(1)}]] ", s)
+        # 句子结束判定（句号、问号、叹号）
+        # 缩写词末尾的句点（如 L.I. / U.S.A. / Mr. / Dr. / e.g.）不触发断句
+        if word[-1] in _SENTENCE_END_SET:
+            if not _is_abbreviation(word):
+                flush_sentence()
 
-            # 扫描 token
-            for token in s.split():
-                if token.startswith("[[TS:") and token.endswith("]]"):
-                    effective_time = token[5:-2]
-                    continue
+    for line in vtt_lines:
+        line = line.strip(_VTT_LINE_STRIP)
 
-                word = token.strip()
-                if not word:
-                    continue
+        # cue 头
+        m = _VTT_CUE_HEADER_RE.match(line)
+        if m:
+            cue_start_time = m.group(1)
+            effective_time = cue_start_time
+            continue
 
-                # 记录首词时间
-                if current_sentence_start_time is None:
-                    current_sentence_start_time = effective_time or cue_start_time
+        # 只处理含逐词时间戳的行
+        if not _VTT_TS_TAG_RE.search(line):
+            continue
 
-                current_words.append(word)
+        # 单遍 token 扫描：时间戳更新 effective_time，c 标签被模式吞掉，
+        # 词直接进 consume_word，整行不再产生任何中间字符串
+        for m_tok in _VTT_TOKEN_RE.finditer(line):
+            ts = m_tok.group(1)
+            if ts is not None:
+                effective_time = ts
+            elif m_tok.group(2) is not None:
+                consume_word(m_tok.group(2))
 
-                # 句子结束判定（句号、问号、叹号）
-                # 缩写词末尾的句点（如 L.I. / U.S.A. / Mr. / Dr. / e.g.）不触发断句
-                if word.strip().endswith(tuple(SENTENCE_END)):
-                    if not _is_abbreviation(word):
-                        flush_sentence()
+        if ready:
+            yield from ready
+            ready.clear()
 
-        # 文件结束，收尾
-        flush_sentence()
-        return sentences
+    # 文件结束，收尾
+    flush_sentence()
+    yield from ready
 
-    vtt_content = Path(vtt_file_path).read_text(encoding="utf-8", errors="ignore")
-    sentences = vtt_to_sentences(vtt_content)
+
+def _pack_paragraph_batches(paragraphs, seg_size, char_limit=2000):
+    """用前缀和 + searchsorted 一次性算出翻译分段边界。
+
+    与原来逐段累加的 Python 循环等价：每个分段最多 seg_size 个段落、
+    总字符不超过 char_limit；单个段落自身超限时独占一个分段。
+    几千个段落时边界计算全部落在 C 层，省掉逐段的解释器开销。
+    """
+    if not paragraphs:
+        return []
+    lens = np.fromiter((len(p) for p in paragraphs), dtype=np.int64, count=len(paragraphs))
+    cum = np.cumsum(lens)
+    batches = []
+    start = 0
+    n = len(paragraphs)
+    while start < n:
+        base = int(cum[start - 1]) if start else 0
+        end = int(np.searchsorted(cum, base + char_limit, side='right'))
+        end = min(end, start + seg_size)
+        if end <= start:
+            end = start + 1
+        batches.append("\n".join(paragraphs[start:end]))
+        print(f"调试信息：分段 {len(batches)} 包含 {end - start} 个段落，共 {int(cum[end - 1]) - base} 字符")
+        start = end
+    return batches
+
+
+def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
+    """从VTT文件翻译字幕，生成带时间戳的文本文件（单步执行的完整逻辑）"""
+    # 获取配置，如果未提供则使用全局变量
+    cfg_api_url = api_config.get("API_URL", API_URL) if api_config else API_URL
+    cfg_api_key = api_config.get("API_KEY", API_KEY) if api_config else API_KEY
+    cfg_model = api_config.get("MODEL_NAME", MODEL_NAME) if api_config else MODEL_NAME
+    cfg_max_workers = api_config.get("MAX_WORKERS", MAX_WORKERS) if api_config else MAX_WORKERS
+    cfg_seg_size = api_config.get("SEGMENT_SIZE", SEGMENT_SIZE) if api_config else SEGMENT_SIZE
+
+    cfg_use_local = api_config.get("use_local_model", False) if api_config else False
+    cfg_local_repo = api_config.get("local_model_repo", "tencent/Hy-MT2-1.8B-GGUF") if api_config else "tencent/Hy-MT2-1.8B-GGUF"
+    cfg_local_file = api_config.get("local_model_file", "Hy-MT2-1.8B-Q4_K_M.gguf") if api_config else "Hy-MT2-1.8B-Q4_K_M.gguf"
+    cfg_local_gpu = api_config.get("local_gpu_layers", -1) if api_config else -1
+    cfg_local_ctx = api_config.get("local_n_ctx", 8192) if api_config else 8192
+    cfg_local_chunk_size = api_config.get("local_chunk_size", 10) if api_config else 10
+    cfg_local_term = api_config.get("local_terminology", "") if api_config else ""
+
+    # 逐行流式解析并直接写出中间 txt：解析、落盘一遍完成
+    output_txt_file = os.path.splitext(vtt_file_path)[0] + ".txt"
+    sentences = []
+    with open(vtt_file_path, encoding="utf-8", errors="ignore") as _vtt_f, \
+            open(output_txt_file, 'w', encoding='utf-8') as _txt_f:
+        for sent in vtt_to_sentences(_vtt_f):
+            _txt_f.write(f"{sent}\n\n")
+            sentences.append(sent)
 
     print(f"调试信息：解析出 {len(sentences)} 个句子")
     if sentences:
@@ -1239,11 +1882,6 @@ def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
         for i, s in enumerate(sentences[:3]):
             print(f"  {i+1}: {s[:100]}...")
 
-    output_txt_file = os.path.splitext(vtt_file_path)[0] + ".txt"
-    with open(output_txt_file, 'w', encoding='utf-8') as f:
-        for seg in sentences:
-            f.write(seg + "\n\n")
-
     if cfg_use_local:
         cfg_log_callback = api_config.get("log_callback", None) if api_config else None
         model_path = download_model(repo_id=cfg_local_repo, filename=cfg_local_file, log_callback=cfg_log_callback)
@@ -1267,31 +1905,21 @@ def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
         optimize_speaking_rate_in_file(final_output_file, log_callback=cfg_log_callback)
         return final_output_file
 
-    paragraphs = [line.strip() for line in open(output_txt_file, 'r', encoding='utf-8') if line.strip()]
+    # sentences 本来就在内存里，不必把刚写出去的 txt 再读回来解码一遍
+    paragraphs = [s.strip() for s in sentences if s.strip()]
 
     print(f"调试信息：读取到 {len(paragraphs)} 个段落")
 
-    batched_paragraphs = []
-    current_batch = []
-    current_char_count = 0
-
-    for i, paragraph in enumerate(paragraphs):
-        paragraph_char_count = len(paragraph)
-        if (len(current_batch) >= cfg_seg_size) or (current_char_count + paragraph_char_count > 2000 and current_batch):
-            batched_paragraphs.append("\n".join(current_batch))
-            print(f"调试信息：分段 {len(batched_paragraphs)} 包含 {len(current_batch)} 个段落，共 {current_char_count} 字符")
-            current_batch = [paragraph]
-            current_char_count = paragraph_char_count
-        else:
-            current_batch.append(paragraph)
-            current_char_count += paragraph_char_count
-
-    if current_batch:
-        batched_paragraphs.append("\n".join(current_batch))
-        print(f"调试信息：最后一个分段 {len(batched_paragraphs)} 包含 {len(current_batch)} 个段落，共 {current_char_count} 字符")
+    batched_paragraphs = _pack_paragraph_batches(paragraphs, cfg_seg_size)
 
     print(f"调试信息：总共 {len(batched_paragraphs)} 个翻译分段")
 
+    # 请求头对所有分段、所有重试都一样，构造一次全员共享
+    api_headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {cfg_api_key}"
+    }
+
     def translate_batch(batch, batch_index):
         max_retries = 3
         user_content = batch
@@ -1299,20 +1927,23 @@ def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
         cleaned = ""
         fallback_to_local = False
 
+        # 完全相同的分段直接复用之前的译文
+        cache_key = _translate_cache_key(batch, cfg_api_url, cfg_model)
+        cached = _translate_cache_get(cache_key)
+        if cached:
+            print(f"调试信息：分段 {batch_index} 命中翻译缓存，跳过API调用")
+            return cached
+
         for attempt in range(1, max_retries + 1):
             try:
                 print(f"调试信息：开始翻译分段 {batch_index}（第 {attempt}/{max_retries} 次），内容长度: {len(batch)} 字符")
                 print(f"分段内容预览: {batch[:200]}...")
 
                 url = cfg_api_url
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {cfg_api_key}"
-                }
                 payload = {
                     "model": cfg_model,
                     "messages": [
-                        {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+                        _TRANSLATE_SYSTEM_MSG,
                         {"role": "user", "content": user_content}
                     ],
                     "stream": False,
@@ -1320,20 +1951,19 @@ def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
                     "temperature": 0.3
                 }
                 print(f"调试信息：分段 {batch_index} 发送API请求到 {url}")
-                response = requests.post(url, json=payload, headers=headers, timeout=60)
-                print(f"调试信息：分段 {batch_index} API响应状态码: {response.status_code}")
-                response.raise_for_status()
-                result = response.json()
+                result = _post_llm(url, payload, api_headers, timeout=60)
                 translated_content = result['choices'][0]['message']['content']
 
                 # 清理不需要朗读的字符 / Clean characters not to be read
-                translated_content = translated_content.replace('&gt;', '').replace('>>', '').replace('& trash;', '').replace('[音乐]', '').replace('[笑声]', '')
+                translated_content = _CLEANUP_RE.sub('', translated_content)
 
                 # 校验并清洗翻译结果
                 cleaned, is_valid, error_msg = validate_and_clean_translation(translated_content, batch, batch_index)
                 if is_valid:
                     print(f"调试信息：分段 {batch_index} 翻译校验通过（第 {attempt} 次），返回内容长度: {len(cleaned)} 字符")
                     print(f"翻译内容预览: {cleaned[:200]}...")
+                    _translate_cache_put(cache_key, cleaned)
+                    _translate_cache_save_throttled()
                     return cleaned
 
                 print(f"调试信息：分段 {batch_index} 第 {attempt} 次校验失败: {error_msg}")
@@ -1375,38 +2005,101 @@ def translate_subtitles_from_vtt(vtt_file_path, api_config=None):
             local_result = _translate_with_local_llm(batch)
             if local_result:
                 print(f"调试信息：分段 {batch_index} 本地模型兜底成功")
+                _translate_cache_put(cache_key, local_result)
+                _translate_cache_save_throttled()
                 return local_result
             print(f"调试信息：分段 {batch_index} 本地模型兜底失败")
 
+        # 失败结果（Error:）不进缓存，下次还有机会重新翻译
         if cleaned:
             return cleaned
         return f"Error: {last_error or '未知错误'}"
 
-    translated_results = {}
-    with ThreadPoolExecutor(max_workers=cfg_max_workers) as executor:
-        futures = {executor.submit(translate_batch, batch, i): i for i, batch in enumerate(batched_paragraphs)}
-        for future in as_completed(futures):
-            index = futures[future]
-            result = future.result()
-            if not result.startswith("Error:"):
-                translated_results[index] = result
-
-    translated_paragraphs = []
-    failed_count = 0
-    for i in range(len(batched_paragraphs)):
-        if i in translated_results:
-            translated_paragraphs.append(translated_results[i])
+    # 每次 API 调用打包几个分段：JSON 信封按键保序，请求数降为 1/N；
+    # 信封解析失败或某个 value 校验不过时，该分段退回 translate_batch 逐段翻译
+    SUPER_BATCH_SIZE = 4
+
+    def translate_super_batch(indices, segs):
+        envelope = {str(i): seg for i, seg in zip(indices, segs)}
+        user_content = (
+            "把下面JSON对象中每个value的字幕翻译成中文，"
+            "每行保持以 (HH:MM:SS.mmm) 时间戳开头、行数与原文一致。"
+            "返回键完全相同的JSON对象，value为对应译文：\n"
+            + json.dumps(envelope, ensure_ascii=False)
+        )
+        parsed = {}
+        try:
+            payload = {
+                "model": cfg_model,
+                "messages": [
+                    _TRANSLATE_SYSTEM_MSG,
+                    {"role": "user", "content": user_content}
+                ],
+                "stream": False,
+                "max_tokens": 4000,
+                "temperature": 0.3,
+                "response_format": {"type": "json_object"}
+            }
+            print(f"调试信息：合并翻译分段 {indices}，共 {sum(len(s) for s in segs)} 字符")
+            content = _post_llm(cfg_api_url, payload, api_headers, timeout=120)['choices'][0]['message']['content']
+            parsed = orjson.loads(content) if orjson is not None else json.loads(content)
+            if not isinstance(parsed, dict):
+                parsed = {}
+        except Exception as e:
+            print(f"调试信息：分段 {indices} 合并调用失败({e})，退回逐段翻译")
+
+        results = {}
+        for idx, seg in zip(indices, segs):
+            val = parsed.get(str(idx))
+            if isinstance(val, str) and val.strip():
+                val = _CLEANUP_RE.sub('', val)
+                cleaned, is_valid, error_msg = validate_and_clean_translation(val, seg, idx)
+                if is_valid:
+                    _translate_cache_put(_translate_cache_key(seg, cfg_api_url, cfg_model), cleaned)
+                    _translate_cache_save_throttled()
+                    results[idx] = cleaned
+                    continue
+                print(f"调试信息：分段 {idx} 合并结果校验失败({error_msg})，退回逐段翻译")
+            results[idx] = translate_batch(seg, idx)
+        return results
+
+    # 下标是致密的 0..N-1，直接用预分配列表按位写入，省掉事后的 dict 查找重建
+    translated_results = [None] * len(batched_paragraphs)
+
+    # 命中缓存的分段直接填结果，剩下的才进合并调用
+    pending_indices = []
+    for i, batch in enumerate(batched_paragraphs):
+        cached = _translate_cache_get(_translate_cache_key(batch, cfg_api_url, cfg_model))
+        if cached:
+            print(f"调试信息：分段 {i} 命中翻译缓存，跳过API调用")
+            translated_results[i] = cached
         else:
-            failed_count += 1
-            translated_paragraphs.append(f"翻译失败的分段 {i+1}")
+            pending_indices.append(i)
+
+    groups = [pending_indices[g:g + SUPER_BATCH_SIZE]
+              for g in range(0, len(pending_indices), SUPER_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=min(cfg_max_workers, len(groups)) or 1) as executor:
+        futures = [executor.submit(translate_super_batch, idxs,
+                                   [batched_paragraphs[i] for i in idxs])
+                   for idxs in groups]
+        for future in as_completed(futures):
+            for index, result in future.result().items():
+                if not result.startswith("Error:"):
+                    translated_results[index] = result
+
+    # 整批跑完后统一落盘一次，避免每个分段都重写缓存文件
+    _translate_cache_save()
+
+    failed_count = translated_results.count(None)
+    translated_paragraphs = [r if r is not None else f"翻译失败的分段 {i+1}"
+                             for i, r in enumerate(translated_results)]
 
     if failed_count > 0:
         print(f"警告：{failed_count} 个分段翻译失败")
 
     final_output_file = os.path.splitext(vtt_file_path)[0] + "_translated.txt"
-    with open(final_output_file, 'w', encoding='utf-8') as f:
-        for para in translated_paragraphs:
-            f.write(para + "\n\n")
+    with open(final_output_file, 'w', encoding='utf-8', buffering=1 << 18) as f:
+        f.write("\n\n".join(translated_paragraphs) + "\n\n")
 
     print(f"翻译完成，保存到: {final_output_file}")
     _api_log_cb = api_config.get("log_callback", None) if api_config else None
@@ -1443,22 +2136,43 @@ def process_tts_with_speed_adjustment(txt_file_path, output_mp3_path, subtitles_
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            bufsize=1
+            stderr=subprocess.STDOUT
         )
-        
-        # 实时打印子进程输出
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
-            if line:
-                print(f"[TTS-Process] {line.strip()}", flush=True)
-                
-        returncode = process.poll()
+
+        # 用 select 等子进程输出：有数据时一次 os.read 吞掉整段突发日志，
+        # 安静时睡在 select 里，不再逐行 readline + poll 自旋
+        out_fd = process.stdout.fileno()
+        os.set_blocking(out_fd, False)
+        sel = selectors.DefaultSelector()
+        sel.register(process.stdout, selectors.EVENT_READ)
+        pending = b""
+
+        def _print_tts_lines(chunk):
+            nonlocal pending
+            pending += chunk
+            *full_lines, pending = pending.split(b"\n")
+            for raw in full_lines:
+                text_line = raw.decode('utf-8', errors='replace').strip()
+                if text_line:
+                    print(f"[TTS-Process] {text_line}", flush=True)
+
+        try:
+            while True:
+                if sel.select(timeout=0.5):
+                    data = os.read(out_fd, 65536)
+                    if data:
+                        _print_tts_lines(data)
+                        continue
+                    break  # EOF，子进程已关闭 stdout
+                # select 超时才轮询一次退出状态
+                if process.poll() is not None:
+                    break
+        finally:
+            sel.close()
+        if pending:
+            _print_tts_lines(b"\n")
+
+        returncode = process.wait()
         
         if returncode == 0 and os.path.exists(output_mp3_path):
             print(f"TTS子进程执行成功，输出文件: {output_mp3_path}", flush=True)
@@ -1469,7 +2183,6 @@ def process_tts_with_speed_adjustment(txt_file_path, output_mp3_path, subtitles_
             
     except Exception as e:
         print(f"执行TTS子进程时出错: {e}", flush=True)
-        import traceback
         traceback.print_exc()
         return None
 
@@ -1515,6 +2228,8 @@ VOICE_ALIAS_MAP = {
     "男声-云希": "zh-CN-YunxiNeural",
 }
 VOICE_ALIAS_REVERSE = {v: k for k, v in VOICE_ALIAS_MAP.items()}
+# 批量输入行 "URL|配音标签" 的解析：一次 match 顶掉 split + 两次 strip
+_BATCH_LINE_RE = re.compile(r'^\s*([^|]*?)\s*(?:\|\s*(.*?)\s*)?$')
 SELECTED_VOICE = st.sidebar.selectbox("TTS语音角色", options=VOICE_CHOICES, index=1, key="selected_voice")
 
 MAX_WORKERS = st.sidebar.slider("翻译并发数", min_value=1, max_value=20, value=10, help="同时翻译的段落数量")
@@ -1582,6 +2297,167 @@ if not os.path.exists(TEMP_DIR):
 
 temp_dir = None
 
+@st.cache_resource
+def _write_cookies_file(cookies_text):
+    """把 YouTube cookies 写入文件并返回路径（按内容缓存）。
+
+    Streamlit 每次交互都会重跑整个脚本，tab4/tab5 原本每次重跑都把
+    同样的内容重写一遍；缓存后同一份 cookies 每个会话只写一次。
+    """
+    if not cookies_text.strip():
+        return None
+    path = os.path.join(TEMP_DIR, "youtube_cookies.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(cookies_text.strip())
+    return path
+
+def get_cookies_path(cookies_text):
+    """取 cookies 文件路径；文件被清掉时补写一次。
+
+    tab1 的清空temp会把缓存过的 cookies 文件一起删掉，而 cache_resource
+    只记得路径；不在这里校验的话，之后所有 tab 的 --cookies 都会
+    指向一个不存在的文件
+    """
+    path = _write_cookies_file(cookies_text)
+    if path and not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(cookies_text.strip())
+    return path
+
+@st.cache_data
+def derive_paths(vtt_file):
+    """由 vtt 文件名一次推导各步骤共用的输出路径 (txt, mp3, mp4)。
+
+    原来 tab2~tab7 各自用 splitext 拼接，mp3 路径算了两遍、mp4 路径
+    （final_video 和 trimmed_video）也算了两遍；集中推导既省掉每次
+    rerun 的重复字符串操作，也避免两处推导日后悄悄不一致。
+    """
+    base = os.path.splitext(os.path.basename(vtt_file))[0]
+    sub = os.path.join(TEMP_DIR, "subtitles")
+    txt = os.path.join(sub, base + "_translated.txt")
+    mp3 = os.path.join(sub, base + "_translated.mp3")
+    mp4 = os.path.join(sub, base + "_translated.mp4")
+    return txt, mp3, mp4
+
+@st.cache_data
+def load_upload_config(path, mtime):
+    """读取 upload_config（JSON 伴生文件优先，pkl 兜底）。
+
+    以 (路径, mtime) 为缓存键：文件没变时每次 rerun 直接命中缓存，
+    不再反复打开并反序列化。内容是纯数据（标题字符串+标签列表），
+    JSON 跨 Python 版本稳妥，旧的 pkl 仍可读。
+    """
+    try:
+        with open(path + '.json', 'rb') as f:
+            return _loads_status(f.read())
+    except (OSError, ValueError):
+        pass
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_upload_config(path, data):
+    """写 upload_config：最高协议的 pkl 加一份 .json 伴生文件。"""
+    with open(path, 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        with open(path + '.json', 'wb') as f:
+            f.write(_dumps_status(data))
+    except Exception as e:
+        print(f"写入 upload_config.json 失败: {e}")
+
+
+
+def _render_workflow_steps(current_status):
+    """渲染单视频工作流的步骤卡片与日志（运行中面板的主体）"""
+    steps = current_status.get("steps", {})
+
+    for step_name, step_info in steps.items():
+        status = step_info.get("status", "pending")
+        msg = step_info.get("message", "")
+
+        icon = "⏳"
+        css_class = "step-card"
+        if status == "running":
+            icon = "🔄"
+            css_class = "step-card step-running"
+        elif status == "success":
+            icon = "✅"
+            css_class = "step-card step-success"
+        elif status == "error":
+            icon = "❌"
+            css_class = "step-card step-error"
+
+        st.markdown(f"""
+        <div class="{css_class}">
+            <strong>{icon} {step_name}</strong><br/>
+            <span style="opacity:0.8; font-size:0.9em">{msg}</span>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # 显示日志
+    with st.expander("查看详细日志", expanded=True):
+        logs = current_status.get("logs", [])
+        for log in logs[-10:]:  # 只显示最后10条
+            st.text(log)
+
+
+def _render_batch_status(batch_status):
+    """渲染批量工作流的总体进度、视频卡片、日志与当前子步骤"""
+    # 总体进度
+    total = batch_status.get("total_videos", 0)
+    current_idx = batch_status.get("current_index", -1)
+    done_count = sum(1 for v in batch_status.get("video_results", []) if v["status"] in ("success", "error"))
+    st.progress(done_count / total if total > 0 else 0, text=f"总进度: {done_count}/{total}")
+
+    # 每个视频的状态卡片
+    for vr in batch_status.get("video_results", []):
+        vs = vr.get("status", "pending")
+        vm = vr.get("message", "")
+        vurl = vr.get("url", "")
+        vidx = vr.get("index", 0)
+
+        icon = "⏳"
+        css = "video-card"
+        if vs == "running":
+            icon = "🔄"
+            css = "video-card video-running"
+        elif vs == "success":
+            icon = "✅"
+            css = "video-card video-success"
+        elif vs == "error":
+            icon = "❌"
+            css = "video-card video-error"
+
+        st.markdown(f"""
+        <div class="{css}">
+            <strong>{icon} 视频 {vidx+1}</strong> &nbsp; <code style="color:#ddd;">{vurl[:60]}{'...' if len(vurl)>60 else ''}</code><br/>
+            <span style="opacity:0.8; font-size:0.9em">{vm}</span>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # 日志
+    with st.expander("查看详细日志", expanded=False):
+        logs = batch_status.get("logs", [])
+        for log in logs[-15:]:
+            st.text(log)
+
+    # 如果当前有正在处理的视频，显示其子步骤
+    if 0 <= current_idx < total:
+        current_vr = batch_status["video_results"][current_idx]
+        if current_vr["status"] == "running":
+            batch_dir = BatchWorkflowManager.get_batch_dir(TEMP_DIR)
+            video_temp = os.path.join(batch_dir, f"video_{current_idx}")
+            single_st = WorkflowManager.load_status(video_temp)
+            if single_st:
+                with st.expander(f"📋 视频 {current_idx+1} 详细步骤", expanded=True):
+                    for sn, si in single_st.get("steps", {}).items():
+                        s_status = si.get("status", "pending")
+                        s_msg = si.get("message", "")
+                        s_icon = {"pending": "⏳", "running": "🔄", "success": "✅", "error": "❌"}.get(s_status, "⏳")
+                        st.text(f"  {s_icon} {sn}: {s_msg}")
+
+
 tab0, tab8, tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "0️🚀 一键工作流",
         "📦 批量工作流",
@@ -1642,44 +2518,28 @@ with tab0:
              WorkflowManager.request_stop(TEMP_DIR)
              st.rerun()
         
-        # 显示进度
-        steps = current_status.get("steps", {})
-        
-        for step_name, step_info in steps.items():
-            status = step_info.get("status", "pending")
-            msg = step_info.get("message", "")
-            
-            icon = "⏳"
-            css_class = "step-card"
-            if status == "running":
-                icon = "🔄"
-                css_class = "step-card step-running"
-            elif status == "success":
-                icon = "✅"
-                css_class = "step-card step-success"
-            elif status == "error":
-                icon = "❌"
-                css_class = "step-card step-error"
-            
-            st.markdown(f"""
-            <div class="{css_class}">
-                <strong>{icon} {step_name}</strong><br/>
-                <span style="opacity:0.8; font-size:0.9em">{msg}</span>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # 显示日志
-        with st.expander("查看详细日志", expanded=True):
-            logs = current_status.get("logs", [])
-            for log in logs[-10:]:  # 只显示最后10条
-                st.text(log)
-        
-        # 自动刷新逻辑
-        time.sleep(2)
-        try:
-            st.rerun()
-        except AttributeError:
-            st.experimental_rerun()
+        if hasattr(st, "fragment"):
+            # 新版 Streamlit：只定时刷新状态面板这个 fragment，
+            # 表单、其他 tab 不再每 2 秒整页重跑一遍。
+            # fragment 重跑不会重新执行脚本顶部，闭包里的 WorkflowManager
+            # 还是定义时那个模块的类；load_status 每次都按状态文件 mtime
+            # 重读磁盘，所以这里拿到的始终是后台线程的最新进度
+            @st.fragment(run_every=2)
+            def _workflow_status_panel():
+                status = WorkflowManager.load_status(TEMP_DIR)
+                if not (status and status.get("is_running", False)):
+                    st.rerun(scope="app")
+                _render_workflow_steps(status)
+
+            _workflow_status_panel()
+        else:
+            # 旧版 Streamlit 兜底：保留整页 sleep + rerun 轮询
+            _render_workflow_steps(current_status)
+            time.sleep(2)
+            try:
+                st.rerun()
+            except AttributeError:
+                st.experimental_rerun()
             
     else:
         # --- 空闲状态，显示输入表单 ---
@@ -1796,65 +2656,25 @@ with tab8:
             BatchWorkflowManager.request_stop(TEMP_DIR)
             st.rerun()
 
-        # 总体进度
-        total = batch_status.get("total_videos", 0)
-        current_idx = batch_status.get("current_index", -1)
-        done_count = sum(1 for v in batch_status.get("video_results", []) if v["status"] in ("success", "error"))
-        st.progress(done_count / total if total > 0 else 0, text=f"总进度: {done_count}/{total}")
-
-        # 每个视频的状态卡片
-        for vr in batch_status.get("video_results", []):
-            vs = vr.get("status", "pending")
-            vm = vr.get("message", "")
-            vurl = vr.get("url", "")
-            vidx = vr.get("index", 0)
-
-            icon = "⏳"
-            css = "video-card"
-            if vs == "running":
-                icon = "🔄"
-                css = "video-card video-running"
-            elif vs == "success":
-                icon = "✅"
-                css = "video-card video-success"
-            elif vs == "error":
-                icon = "❌"
-                css = "video-card video-error"
-
-            st.markdown(f"""
-            <div class="{css}">
-                <strong>{icon} 视频 {vidx+1}</strong> &nbsp; <code style="color:#ddd;">{vurl[:60]}{'...' if len(vurl)>60 else ''}</code><br/>
-                <span style="opacity:0.8; font-size:0.9em">{vm}</span>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # 日志
-        with st.expander("查看详细日志", expanded=False):
-            logs = batch_status.get("logs", [])
-            for log in logs[-15:]:
-                st.text(log)
-
-        # 如果当前有正在处理的视频，显示其子步骤
-        if 0 <= current_idx < total:
-            current_vr = batch_status["video_results"][current_idx]
-            if current_vr["status"] == "running":
-                batch_dir = BatchWorkflowManager.get_batch_dir(TEMP_DIR)
-                video_temp = os.path.join(batch_dir, f"video_{current_idx}")
-                single_st = WorkflowManager.load_status(video_temp)
-                if single_st:
-                    with st.expander(f"📋 视频 {current_idx+1} 详细步骤", expanded=True):
-                        for sn, si in single_st.get("steps", {}).items():
-                            s_status = si.get("status", "pending")
-                            s_msg = si.get("message", "")
-                            s_icon = {"pending": "⏳", "running": "🔄", "success": "✅", "error": "❌"}.get(s_status, "⏳")
-                            st.text(f"  {s_icon} {sn}: {s_msg}")
-
-        # 自动刷新
-        time.sleep(3)
-        try:
-            st.rerun()
-        except AttributeError:
-            st.experimental_rerun()
+        if hasattr(st, "fragment"):
+            # 同 tab0：只刷新批量状态面板，避免整页轮询；
+            # load_status 按 mtime 重读磁盘，fragment 不会卡在定义时的快照上
+            @st.fragment(run_every=3)
+            def _batch_status_panel():
+                status = BatchWorkflowManager.load_status(TEMP_DIR)
+                if not (status and status.get("is_running", False)):
+                    st.rerun(scope="app")
+                _render_batch_status(status)
+
+            _batch_status_panel()
+        else:
+            # 旧版 Streamlit 兜底：保留整页 sleep + rerun 轮询
+            _render_batch_status(batch_status)
+            time.sleep(3)
+            try:
+                st.rerun()
+            except AttributeError:
+                st.experimental_rerun()
 
     else:
         # --- 空闲状态 ---
@@ -1918,6 +2738,13 @@ with tab8:
             st.caption(f"可用角色: {alias_list}")
 
         bcol1, bcol2 = st.columns([2, 1])
+        with bcol1:
+            batch_concurrency = st.number_input(
+                "并发视频数",
+                min_value=1, max_value=4, value=1, step=1,
+                key="batch_concurrency",
+                help="同时处理的视频数。单视频流水线大头是网络等待（下载/API/上传），适度并发能近线性提速；注意并发越高越容易触发 API 限流。"
+            )
         with bcol2:
             batch_auto_upload = st.checkbox("自动上传到B站", value=True, help="每个视频完成后自动上传", key="batch_auto_upload")
 
@@ -1929,15 +2756,14 @@ with tab8:
             else:
                 parsed_items = []
                 for line in raw_lines:
-                    if "|" in line:
-                        parts = line.split("|", 1)
-                        url_part = parts[0].strip()
-                        voice_tag = parts[1].strip()
+                    m = _BATCH_LINE_RE.match(line)
+                    url_part, voice_tag = m.group(1), m.group(2)
+                    if voice_tag is not None:
                         # 将中文别名转换为实际语音ID
                         voice_id = VOICE_ALIAS_MAP.get(voice_tag, voice_tag)
-                        parsed_items.append({"url": url_part, "voice": voice_id})
                     else:
-                        parsed_items.append({"url": line.strip(), "voice": SELECTED_VOICE})
+                        voice_id = SELECTED_VOICE
+                    parsed_items.append({"url": url_part, "voice": voice_id})
 
                 st.info(f"即将处理 {len(parsed_items)} 个视频")
 
@@ -1945,6 +2771,7 @@ with tab8:
                     "base_dir": TEMP_DIR,
                     "items": parsed_items,
                     "auto_upload": batch_auto_upload,
+                    "concurrency": int(batch_concurrency),
                     "api_url": API_URL,
                     "api_key": API_KEY,
                     "model_name": MODEL_NAME,
@@ -1994,27 +2821,37 @@ with tab1:
                     subtitles_dir = os.path.join(temp_dir, "subtitles")
                     os.makedirs(subtitles_dir, exist_ok=True)
                     
-                    cookies_file_path = None
-                    if YT_COOKIES.strip():
-                        cookies_file_path = os.path.join(temp_dir, "youtube_cookies.txt")
-                        with open(cookies_file_path, 'w', encoding='utf-8') as f:
-                            f.write(YT_COOKIES.strip())
-                    
+                    # get_cookies_path 自带"文件被清空temp删掉后补写"的兜底
+                    cookies_file_path = get_cookies_path(YT_COOKIES)
+
+                    # --print-json 让字幕下载这一次调用顺带吐出元数据，
+                    # 标题步骤就不用再起一次 yt-dlp；解析失败才回退单独请求
                     args = [
                         '--write-auto-sub',
                         '--skip-download',
                         '--sub-langs', 'en',
+                        '--print-json',
                         '--quiet',
-                        '-o', os.path.join(subtitles_dir, '%(title)s.%(ext)s'),
+                        # 输出名固定成 word_level，字幕落在已知路径，正常情况不用扫目录
+                        '-o', os.path.join(subtitles_dir, 'word_level.%(ext)s'),
                         youtube_url
                     ]
-                    run_yt_dlp_subprocess(args, cookies_file_path)
-                    
-                    vtt_files = list(Path(subtitles_dir).glob("*.vtt"))
-                    if vtt_files:
-                        original_file = vtt_files[0]
+                    stdout = run_yt_dlp_subprocess(args, cookies_file_path)
+                    tab1_info = {}
+                    try:
+                        tab1_info = json.loads(stdout.strip().splitlines()[-1])
+                    except Exception as e:
+                        print(f"解析 --print-json 输出失败（标题步骤将回退单独获取）: {e}")
+
+                    # yt-dlp 会在字幕名里插入语言码，预期路径是 word_level.en.vtt；
+                    # 不在时才退回 glob 扫描
+                    original_file = os.path.join(subtitles_dir, "word_level.en.vtt")
+                    if not os.path.exists(original_file):
+                        vtt_files = list(Path(subtitles_dir).glob("*.vtt"))
+                        original_file = str(vtt_files[0]) if vtt_files else None
+                    if original_file:
                         new_file = os.path.join(subtitles_dir, "word_level.vtt")
-                        os.rename(original_file, new_file)
+                        os.replace(original_file, new_file)
                         st.success(f"字幕下载成功！")
                         st.info(f"文件位置: {new_file}")
                     else:
@@ -2023,11 +2860,14 @@ with tab1:
                     st.markdown("---")
                     st.info("正在获取并翻译视频标题...")
                     
-                    args = ['--dump-json', '--skip-download', '--quiet', youtube_url]
-                    stdout = run_yt_dlp_subprocess(args, cookies_file_path)
-                    info_dict = json.loads(stdout)
-                    original_title = info_dict.get('title', '')
-                    
+                    # 元数据已随字幕下载的 --print-json 一起拿到，缺失时才单独请求
+                    original_title = tab1_info.get('title', '')
+                    if not original_title:
+                        args = ['--dump-json', '--skip-download', '--quiet', youtube_url]
+                        stdout = run_yt_dlp_subprocess(args, cookies_file_path)
+                        info_dict = json.loads(stdout)
+                        original_title = info_dict.get('title', '')
+
                     if original_title:
                         st.text(f"原始标题: {original_title}")
                         
@@ -2055,13 +2895,10 @@ with tab1:
                             tags_str = ','.join(tags_list)
                             st.text(f"生成标签: {tags_str}")
                         else:
-                            SYSTEM_PROMPT = """你是爆款视频up主，将英文标题翻译成吸引眼球的爆款视频中文标题，直接输出翻译结果，不要解释。"""
-                            
-                            import requests
                             payload = {
                                 "model": MODEL_NAME,
                                 "messages": [
-                                    {"role": "system", "content": SYSTEM_PROMPT},
+                                    {"role": "system", "content": TITLE_SYSTEM_PROMPT},
                                     {"role": "user", "content": original_title}
                                 ]
                             }
@@ -2070,10 +2907,7 @@ with tab1:
                                 "Content-Type": "application/json"
                             }
                             
-                            response = requests.post(API_URL, json=payload, headers=headers, timeout=60)
-                            response_data = response.json()
-                            
-                            translated_title_with_markdown = response_data['choices'][0]['message']['content']
+                            translated_title_with_markdown = _cached_llm_post(API_URL, payload, headers)
                             translated_title = translated_title_with_markdown.replace('**', '').strip()
                             
                             st.text(f"翻译标题: {translated_title}")
@@ -2086,29 +2920,24 @@ with tab1:
                             tags_payload = {
                                 "model": MODEL_NAME,
                                 "messages": [
-                                    {"role": "system", "content": "你是一个专业的B站运营助手"},
+                                    {"role": "system", "content": TAGS_SYSTEM_PROMPT},
                                     {"role": "user", "content": TAGS_PROMPT}
                                 ]
                             }
                             
-                            tags_response = requests.post(API_URL, json=tags_payload, headers=headers, timeout=60)
-                            tags_data = tags_response.json()
-                            
-                            tags_content = tags_data['choices'][0]['message']['content']
-                            tags_list = [t.strip() for t in tags_content.replace('，', ',').split(',') if t.strip()]
+                            tags_content = _cached_llm_post(API_URL, tags_payload, headers)
+                            tags_list = [t.strip() for t in tags_content.translate(_TAG_TRANS).split(',') if t.strip()]
                             tags_str = ','.join(tags_list)
                             
                             st.text(f"生成标签: {tags_str}")
                         
                         upload_config_file = os.path.join(subtitles_dir, "upload_config.pkl")
-                        import pickle
                         upload_data = {
                             'title_desc': f'(中配){translated_title}',
                             'tags': tags_list
                         }
                         
-                        with open(upload_config_file, 'wb') as f:
-                            pickle.dump(upload_data, f)
+                        save_upload_config(upload_config_file, upload_data)
                         
                         st.success("标题翻译和标签生成完成！")
                         st.info(f"配置已保存到: {upload_config_file}")
@@ -2132,88 +2961,14 @@ with tab1:
             else:
                 with st.spinner("正在翻译字幕..."):
                     try:
-                        def vtt_to_sentences(vtt_text):
-                            """将带逐词时间戳的VTT转换为按句分段的文本"""
-                            # 正则：cue 头（起止时间）
-                            CUE_HEADER_RE = re.compile(
-                                r'^(\d{2}:\d{2}:\d{2}\.\d{3})\s*--> (\d{2}:\d{2}:\d{2}\.\d{3})'
-                            )
-                            
-                            # 正则：逐词时间戳 <HH:MM:SS.mmm>
-                            TS_TAG_RE = re.compile(r'<(\d{2}:\d{2}:\d{2}\.\d{3})>')
-                            
-                            # 正则：清理 <c> 或 <c.xxx> 样式标签
-                            C_TAG_RE = re.compile(r'</?c(?:\.[^>]*)?>', re.IGNORECASE)
-                            
-                            SENTENCE_END = ".!?"
-                            
-                            lines = vtt_text.splitlines()
-                            sentences = []
-                            current_words = []
-                            current_sentence_start_time = None
-                            
-                            effective_time = None
-                            cue_start_time = None
-                            
-                            def flush_sentence():
-                                nonlocal current_words, current_sentence_start_time
-                                if not current_words:
-                                    return
-                                text = " ".join(current_words)
-                                text = re.sub(r"\s+([,.;!?])", r"\1", text)
-                                text = re.sub(r"\(\s+", "(", text)
-                                text = re.sub(r"\s+\)", ")", text)
-                                start_ts = current_sentence_start_time or cue_start_time or effective_time or "00:00:00.000"
-                                sentences.append(f"({start_ts}) {text}")
-                                current_words = []
-                                current_sentence_start_time = None
-                            
-                            for line in lines:
-                                line = line.strip("\ufeff\r\n")
-                                
-                                # cue 头
-                                m = CUE_HEADER_RE.match(line)
-                                if m:
-                                    cue_start_time = m.group(1)
-                                    effective_time = cue_start_time
-                                    continue
-                                
-                                # 只处理含逐词时间戳的行
-                                if not TS_TAG_RE.search(line):
-                                    continue
-                                
-                                # 清理 <c> 标签，并把 <timestamp> 变成 [[TS:...]] 哨兵
-                                s = C_TAG_RE.sub("", line)
-                                s = TS_TAG_RE.sub(lambda mm: f" [[TS:{mm.group(1)}]] ", s)
-                                
-                                # 扫描 token
-                                for token in s.split():
-                                    if token.startswith("[[TS:") and token.endswith("]]"):
-                                        effective_time = token[5:-2]
-                                        continue
-                                    
-                                    word = token.strip()
-                                    if not word:
-                                        continue
-                                    
-                                    # 记录首词时间
-                                    if current_sentence_start_time is None:
-                                        current_sentence_start_time = effective_time or cue_start_time
-                                    
-                                    current_words.append(word)
-                                    
-                                    # 句子结束判定（句号、问号、叹号）
-                                    # 缩写词末尾的句点（如 L.I. / U.S.A. / Mr. / Dr. / e.g.）不触发断句
-                                    if word.strip().endswith(tuple(SENTENCE_END)):
-                                        if not _is_abbreviation(word):
-                                            flush_sentence()
-                            
-                            # 文件结束，收尾
-                            flush_sentence()
-                            return sentences
-                        
-                        vtt_content = Path(vtt_file_path).read_text(encoding="utf-8", errors="ignore")
-                        sentences = vtt_to_sentences(vtt_content)
+                        # 逐行流式解析并直接写出中间 txt：解析、落盘一遍完成
+                        output_txt_file = os.path.splitext(vtt_file_path)[0] + ".txt"
+                        sentences = []
+                        with open(vtt_file_path, encoding="utf-8", errors="ignore") as _vtt_f, \
+                                open(output_txt_file, 'w', encoding='utf-8') as _txt_f:
+                            for sent in vtt_to_sentences(_vtt_f):
+                                _txt_f.write(f"{sent}\n\n")
+                                sentences.append(sent)
                         
                         print(f"调试信息：解析出 {len(sentences)} 个句子")
                         if sentences:
@@ -2221,11 +2976,6 @@ with tab1:
                             for i, s in enumerate(sentences[:3]):
                                 print(f"  {i+1}: {s[:100]}...")
                         
-                        output_txt_file = os.path.splitext(vtt_file_path)[0] + ".txt"
-                        with open(output_txt_file, 'w', encoding='utf-8') as f:
-                            for seg in sentences:
-                                f.write(seg + "\n\n")
-                        
                         if USE_LOCAL_MODEL:
                             term_dict = {}
                             if LOCAL_TERMINOLOGY:
@@ -2263,32 +3013,29 @@ with tab1:
                             st.success("本地模型翻译完成！")
                             st.info(f"输出文件: {output_translated_file}")
                         else:
-                            paragraphs = [line.strip() for line in open(output_txt_file, 'r', encoding='utf-8') if line.strip()]
+                            # sentences 本来就在内存里，不必把刚写出去的 txt 再读回来解码一遍
+                            paragraphs = [s.strip() for s in sentences if s.strip()]
                             
                             print(f"调试信息：读取到 {len(paragraphs)} 个段落")
                             
-                            batched_paragraphs = []
-                            current_batch = []
-                            current_char_count = 0
-                            
-                            for i, paragraph in enumerate(paragraphs):
-                                paragraph_char_count = len(paragraph)
-                                if (len(current_batch) >= SEGMENT_SIZE) or (current_char_count + paragraph_char_count > 2000 and current_batch):
-                                    batched_paragraphs.append("\n".join(current_batch))
-                                    print(f"调试信息：分段 {len(batched_paragraphs)} 包含 {len(current_batch)} 个段落，共 {current_char_count} 字符")
-                                    current_batch = [paragraph]
-                                    current_char_count = paragraph_char_count
-                                else:
-                                    current_batch.append(paragraph)
-                                    current_char_count += paragraph_char_count
-                            
-                            if current_batch:
-                                batched_paragraphs.append("\n".join(current_batch))
-                                print(f"调试信息：最后一个分段 {len(batched_paragraphs)} 包含 {len(current_batch)} 个段落，共 {current_char_count} 字符")
+                            batched_paragraphs = _pack_paragraph_batches(paragraphs, SEGMENT_SIZE)
                             
                             print(f"调试信息：总共 {len(batched_paragraphs)} 个翻译分段")
                             
+                            # 请求头对所有分段、所有重试都一样，构造一次全员共享
+                            api_headers = {
+                                "Content-Type": "application/json",
+                                "Authorization": f"Bearer {API_KEY}"
+                            }
+
                             def translate_batch(batch, batch_index):
+                                # 与 workflow 同一套按内容哈希的持久缓存：
+                                # 脚本重跑/中途崩溃后，翻好的分段不再重新计费
+                                cache_key = _translate_cache_key(batch, API_URL, MODEL_NAME)
+                                cached = _translate_cache_get(cache_key)
+                                if cached:
+                                    print(f"调试信息：分段 {batch_index} 命中翻译缓存，跳过API调用")
+                                    return cached
                                 max_retries = 3
                                 user_content = batch
                                 last_error = None
@@ -2296,16 +3043,12 @@ with tab1:
                                     try:
                                         print(f"调试信息：开始翻译分段 {batch_index}（第 {attempt}/{max_retries} 次），内容长度: {len(batch)} 字符")
                                         print(f"分段内容预览: {batch[:200]}...")
-                                        
+
                                         url = API_URL
-                                        headers = {
-                                            "Content-Type": "application/json",
-                                            "Authorization": f"Bearer {API_KEY}"
-                                        }
                                         payload = {
                                             "model": MODEL_NAME,
                                             "messages": [
-                                                {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+                                                _TRANSLATE_SYSTEM_MSG,
                                                 {"role": "user", "content": user_content}
                                             ],
                                             "stream": False,
@@ -2313,16 +3056,15 @@ with tab1:
                                             "temperature": 0.3
                                         }
                                         print(f"调试信息：分段 {batch_index} 发送API请求到 {url}")
-                                        response = requests.post(url, json=payload, headers=headers, timeout=60)
-                                        print(f"调试信息：分段 {batch_index} API响应状态码: {response.status_code}")
-                                        response.raise_for_status()
-                                        result = response.json()
+                                        result = _post_llm(url, payload, api_headers, timeout=60)
                                         translated_content = result['choices'][0]['message']['content']
 
                                         # 校验并清洗翻译结果
                                         cleaned, is_valid, error_msg = validate_and_clean_translation(translated_content, batch, batch_index)
                                         if is_valid:
                                             print(f"调试信息：分段 {batch_index} 翻译校验通过（第 {attempt} 次），返回内容长度: {len(cleaned)} 字符")
+                                            _translate_cache_put(cache_key, cleaned)
+                                            _translate_cache_save_throttled()
                                             return cleaned
 
                                         print(f"调试信息：分段 {batch_index} 第 {attempt} 次校验失败: {error_msg}")
@@ -2340,7 +3082,6 @@ with tab1:
                                         return cleaned if cleaned else f"Error: {last_error}"
                                     except Exception as e:
                                         print(f"调试信息：分段 {batch_index} 第 {attempt} 次异常: {str(e)}")
-                                        import traceback
                                         print(f"调试信息：分段 {batch_index} 错误详情: {traceback.format_exc()}")
                                         last_error = str(e)
                                         if attempt < max_retries:
@@ -2349,34 +3090,50 @@ with tab1:
                                         return f"Error: {last_error}"
                                 return f"Error: {last_error or '未知错误'}"
                             
-                            translated_results = {}
-                            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                                futures = {executor.submit(translate_batch, batch, i): i for i, batch in enumerate(batched_paragraphs)}
-                                
+                            translated_results = [None] * len(batched_paragraphs)
+                            total = len(batched_paragraphs)
+                            results_q = deque()
+                            done_ev = threading.Event()
+
+                            def _collect(fut, index):
+                                exc = fut.exception()
+                                results_q.append((index, f"Error: {exc}" if exc else fut.result()))
+                                done_ev.set()
+
+                            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, total) or 1) as executor:
+                                for i, batch in enumerate(batched_paragraphs):
+                                    fut = executor.submit(translate_batch, batch, i)
+                                    fut.add_done_callback(lambda f, i=i: _collect(f, i))
+
                                 progress_bar = st.progress(0)
                                 completed = 0
-                                for future in as_completed(futures):
-                                    index = futures[future]
-                                    result = future.result()
-                                    if not result.startswith("Error:"):
-                                        translated_results[index] = result
-                                    completed += 1
-                                    progress_bar.progress(completed / len(batched_paragraphs))
-                            
-                            translated_paragraphs = []
-                            failed_count = 0
-                            
-                            for i in range(len(batched_paragraphs)):
-                                if i in translated_results:
-                                    translated_paragraphs.append(translated_results[i])
-                                else:
-                                    failed_count += 1
+                                last_update = 0.0
+                                # 主线程批量收割完成队列；进度条最多每 50ms 刷新一次，
+                                # 每次 progress() 都要过一趟 websocket，逐个刷新会刷爆前端
+                                while completed < total:
+                                    done_ev.wait()
+                                    done_ev.clear()
+                                    while results_q:
+                                        index, result = results_q.popleft()
+                                        if not result.startswith("Error:"):
+                                            translated_results[index] = result
+                                        completed += 1
+                                        now = time.monotonic()
+                                        if now - last_update > 0.05:
+                                            progress_bar.progress(completed / total)
+                                            last_update = now
+                                progress_bar.progress(1.0)
+
+                            # 整批结束后无条件落盘一次，补上节流期间攒下的结果
+                            _translate_cache_save()
                             
+                            failed_count = translated_results.count(None)
+                            translated_paragraphs = [r for r in translated_results if r is not None]
+
                             output_translated_file = os.path.splitext(vtt_file_path)[0] + "_translated.txt"
-                            with open(output_translated_file, 'w', encoding='utf-8') as f:
-                                for seg in translated_paragraphs:
-                                    cleaned = seg.replace('&gt;', '').replace('>>', '').replace('&trash;', '').replace('> ', '').replace('&nbsp;', '').replace('_', '').replace('＞', '').replace('[音乐]', '')
-                                    f.write(cleaned + "\n\n")
+                            cleaned_segs = [_CLEAN_RE.sub('', seg).translate(_CLEAN_TRANS) for seg in translated_paragraphs]
+                            with open(output_translated_file, 'w', encoding='utf-8', buffering=1 << 18) as f:
+                                f.write("\n\n".join(cleaned_segs) + "\n\n")
                             
                             st.success(f"翻译完成！成功: {len(translated_paragraphs)} 段落，失败: {failed_count}")
                             st.info(f"输出文件: {output_translated_file}")
@@ -2386,9 +3143,8 @@ with tab1:
                         with st.expander("🔍 查看详细错误信息"):
                             st.code(traceback.format_exc(), language="python")
     
-    txt_file = os.path.join(TEMP_DIR, "subtitles", os.path.splitext(os.path.basename(vtt_file))[0] + "_translated.txt")
-    mp3_file = os.path.join(TEMP_DIR, "subtitles", os.path.splitext(os.path.basename(vtt_file))[0] + "_translated.mp3")
-    
+    txt_file, mp3_file, final_video = derive_paths(vtt_file)
+
     with tab3:
         st.header("3️🗣️ TTS字幕转语音")
         txt_file_path = st.text_input("翻译后的TXT文件路径", value=txt_file, key="txt_file_path")
@@ -2414,20 +3170,13 @@ with tab1:
                         with st.expander("🔍 查看详细错误信息"):
                             st.code(traceback.format_exc(), language="python")
     
-    mp3_file = os.path.join(TEMP_DIR, "subtitles", os.path.splitext(os.path.basename(vtt_file))[0] + "_translated.mp3")
-    
     with tab4:
         st.header("4️🎬️ 下载视频")
         
         youtube_url = st.text_input("YouTube视频URL", placeholder="https://www.youtube.com/watch?v=...", key="video_url")
         
-        cookies_file_path = None
-        if YT_COOKIES.strip():
-            temp_dir = TEMP_DIR
-            cookies_file_path = os.path.join(temp_dir, "youtube_cookies.txt")
-            with open(cookies_file_path, 'w', encoding='utf-8') as f:
-                f.write(YT_COOKIES.strip())
-        
+        cookies_file_path = get_cookies_path(YT_COOKIES)
+
         if st.button("下载视频", type="primary", key="download_video_btn"):
             if not youtube_url:
                 st.error("请输入YouTube视频URL")
@@ -2445,20 +3194,27 @@ with tab1:
                             '--quiet',
                             youtube_url
                         ]
-                        run_yt_dlp_subprocess(args, cookies_file_path)
-                        
-                        downloaded_files = glob.glob(f"{downloaded_video_base_name}.*")
+                        run_yt_dlp_subprocess(args, cookies_file_path, capture_stdout=False)
+
+                        downloaded_files = find_files_with_prefix(downloaded_video_base_name)
                         if downloaded_files:
                             actual_downloaded_video_path = downloaded_files[0]
                         else:
                             raise FileNotFoundError(f"yt-dlp did not download a file")
                         
                         if os.path.exists(new_audio_path):
-                            final_video_path = os.path.splitext(mp3_file)[0] + ".mp4"
+                            final_video_path = final_video
                             try:
-                                subprocess.run(['ffmpeg', '-y', '-i', actual_downloaded_video_path, '-i', new_audio_path,
-                                                    '-c:v', 'copy', '-c:a', 'aac', '-map', '0:v:0', '-map', '1:a:0',
-                                                    final_video_path], check=True, capture_output=True, text=True)
+                                aac_audio = ensure_aac_audio(new_audio_path)
+                                if aac_audio:
+                                    audio_in, audio_args = aac_audio, ['-c:a', 'copy']
+                                else:
+                                    audio_in, audio_args = new_audio_path, ['-c:a', 'aac', '-b:a', '128k', '-aac_coder', 'fast']
+                                run_ffmpeg(['-y', '-i', actual_downloaded_video_path, '-i', audio_in,
+                                            '-c:v', 'copy'] + audio_args +
+                                           ['-threads', '0', '-movflags', '+faststart',
+                                            '-map', '0:v:0', '-map', '1:a:0',
+                                            final_video_path])
                                 
                                 if os.path.exists(actual_downloaded_video_path):
                                     os.remove(actual_downloaded_video_path)
@@ -2471,9 +3227,8 @@ with tab1:
                                 st.info("提示: 你可以手动使用FFmpeg或视频编辑软件将音频合并到视频中")
                                 
                                 if os.path.exists(actual_downloaded_video_path):
-                                    import shutil
                                     manual_video_path = os.path.splitext(mp3_file)[0] + "_video_only.mp4"
-                                    shutil.copy2(actual_downloaded_video_path, manual_video_path)
+                                    fast_copy(actual_downloaded_video_path, manual_video_path)
                                     st.success(f"已复制视频文件到: {manual_video_path}")
                                     
                         else:
@@ -2485,33 +3240,25 @@ with tab1:
                             st.warning("⚠️ 视频已下载成功，但M3U8修复时出现兼容性问题")
                             st.info("这通常不影响视频的正常使用")
                             
-                        downloaded_files = glob.glob(f"{downloaded_video_base_name}.*")
+                        downloaded_files = find_files_with_prefix(downloaded_video_base_name)
                         if downloaded_files:
                             actual_downloaded_video_path = downloaded_files[0]
                             if os.path.exists(actual_downloaded_video_path):
                                 manual_video_path = os.path.splitext(mp3_file)[0] + "_video_only.mp4"
-                                import shutil
-                                shutil.copy2(actual_downloaded_video_path, manual_video_path)
+                                fast_copy(actual_downloaded_video_path, manual_video_path)
                                 st.success(f"已保存视频文件到: {manual_video_path}")
                         else:
                             st.error(f"下载失败: {str(e)}")
                             with st.expander("🔍 查看详细错误信息"):
                                 st.code(traceback.format_exc(), language="python")
     
-    final_video = os.path.splitext(mp3_file)[0] + ".mp4"
-    
     with tab5:
         st.header("5️🖼️ 处理封面")
         
         youtube_url = st.text_input("YouTube视频URL", placeholder="https://www.youtube.com/watch?v=...", key="cover_url")
         
-        cookies_file_path = None
-        if YT_COOKIES.strip():
-            temp_dir = TEMP_DIR
-            cookies_file_path = os.path.join(temp_dir, "youtube_cookies.txt")
-            with open(cookies_file_path, 'w', encoding='utf-8') as f:
-                f.write(YT_COOKIES.strip())
-        
+        cookies_file_path = get_cookies_path(YT_COOKIES)
+
         if st.button("下载封面", type="primary", key="download_cover_btn"):
             if not youtube_url:
                 st.error("请输入YouTube视频URL")
@@ -2528,7 +3275,7 @@ with tab1:
                             '-o', os.path.join(temp_dir, "subtitles", 'cover.%(ext)s'),
                             youtube_url
                         ]
-                        run_yt_dlp_subprocess(args, cookies_file_path)
+                        run_yt_dlp_subprocess(args, cookies_file_path, capture_stdout=False)
                         
                         input_path = os.path.join(temp_dir, "subtitles", "cover.webp")
                         output_path = os.path.join(temp_dir, "subtitles", "cover.jpeg")
@@ -2536,19 +3283,53 @@ with tab1:
                         if not os.path.exists(input_path):
                             st.error(f"文件不存在: {input_path}")
                         else:
-                            quality = 90
-                            with Image.open(input_path) as img:
-                                if img.mode != 'RGB':
-                                    img = img.convert('RGB')
-                                img.save(output_path, 'jpeg', quality=quality)
-
-                            current_size_kb = os.path.getsize(output_path) / 1024
-                            while current_size_kb > 50 and quality > 4:
-                                quality -= 5
-                                img.save(output_path, 'jpeg', quality=quality)
-                                current_size_kb = os.path.getsize(output_path) / 1024
-                                print(f"当前大小: {current_size_kb:.2f} KB, 质量: {quality}")
-                            
+                            # 快速路径：交给 ffmpeg(libjpeg-turbo) 原生转码，最多尝试两档质量；
+                            # ffmpeg 不可用或结果仍超限时再退回 Pillow 的二分搜索
+                            converted = False
+                            try:
+                                for q in ('5', '15'):
+                                    subprocess.run(['ffmpeg', '-y', '-i', input_path, '-q:v', q, output_path],
+                                                   check=True, capture_output=True)
+                                    if os.path.getsize(output_path) <= 50 * 1024:
+                                        converted = True
+                                        break
+                            except Exception:
+                                converted = False
+
+                            if not converted:
+                                with Image.open(input_path) as img:
+                                    # draft 让解码器在解码阶段直接降采样（JPEG 生效，其他格式为 no-op）
+                                    img.draft('RGB', (1280, 720))
+                                    # draft 只对 JPEG 源降采样，webp/png 封面靠 thumbnail 缩到位
+                                    img.thumbnail((1280, 720), Image.Resampling.LANCZOS)
+                                    img.load()
+                                    if img.mode != 'RGB':
+                                        img = img.convert('RGB')
+                                        # 强制 convert 立即物化像素，循环里的 save 全部复用同一块缓冲
+                                        img.load()
+
+                                    # 在 [10, 90] 上二分质量，编码进内存缓冲，
+                                    # 找到 <=50KB 的最高质量后只落盘一次
+                                    best_buf = None
+                                    buf = None
+                                    lo, hi = 10, 90
+                                    while lo <= hi:
+                                        mid = (lo + hi) // 2
+                                        buf = BytesIO()
+                                        img.save(buf, 'jpeg', quality=mid, optimize=False, progressive=False,
+                                                 subsampling=2)  # 4:2:0，封面图肉眼无差但小 ~40%
+                                        print(f"当前大小: {buf.tell() / 1024:.2f} KB, 质量: {mid}")
+                                        if buf.tell() <= 50 * 1024:
+                                            best_buf = buf
+                                            lo = mid + 1
+                                        else:
+                                            hi = mid - 1
+                                    if best_buf is None:
+                                        best_buf = buf  # 最低质量也超限时保留最后一版
+
+                                with open(output_path, 'wb') as f:
+                                    f.write(best_buf.getvalue())
+
                             st.success(f"封面处理完成！")
                             st.info(f"输出文件: {output_path}")
                     except Exception as e:
@@ -2573,26 +3354,59 @@ with tab1:
             else:
                 with st.spinner("正在剪辑视频..."):
                     try:
-                        output_part1 = os.path.join(os.path.dirname(video_file), "final_video_part1.mp4")
-                        output_part2 = os.path.join(os.path.dirname(video_file), "final_video_part2.mp4")
                         output_video_trimmed = os.path.join(os.path.dirname(video_file), "final_video_trimmed.mp4")
-                        temp_concat_file = os.path.join(os.path.dirname(video_file), "concat_list.txt")
-                        
-                        subprocess.run(['ffmpeg', '-y', '-i', video_file, '-to', trim_start,
-                                                '-c', 'copy', output_part1], check=True)
-                        subprocess.run(['ffmpeg', '-y', '-i', video_file, '-ss', trim_end,
-                                                '-c', 'copy', output_part2], check=True)
-                        
-                        if os.path.exists(output_part1) and os.path.getsize(output_part1) > 0:
+
+                        try:
+                            # 单进程路径：trim + concat 在一个 filter_complex 里完成，
+                            # 不写 part1/part2 中间文件和 concat 列表
+                            start_s = _time_to_seconds(trim_start)
+                            end_s = _time_to_seconds(trim_end)
+                            encoder = (['-c:v', 'h264_nvenc', '-preset', 'p4'] if nvenc_available()
+                                       else ['-c:v', 'libx264', '-preset', 'veryfast'])
+                            fc = (f"[0:v]trim=end={start_s},setpts=PTS-STARTPTS[v0];"
+                                  f"[0:a]atrim=end={start_s},asetpts=PTS-STARTPTS[a0];"
+                                  f"[0:v]trim=start={end_s},setpts=PTS-STARTPTS[v1];"
+                                  f"[0:a]atrim=start={end_s},asetpts=PTS-STARTPTS[a1];"
+                                  f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[v][a]")
+                            run_ffmpeg(['-y', '-i', video_file, '-filter_complex', fc,
+                                        '-map', '[v]', '-map', '[a]'] + encoder +
+                                       ['-c:a', 'aac', output_video_trimmed])
+                        except Exception as e:
+                            # 滤镜路径失败时回退到原来的 三段流拷贝 方案
+                            print(f"filter_complex 剪辑失败({e})，回退到分段拼接")
+                            output_part1 = os.path.join(os.path.dirname(video_file), "final_video_part1.mp4")
+                            output_part2 = os.path.join(os.path.dirname(video_file), "final_video_part2.mp4")
+                            temp_concat_file = os.path.join(os.path.dirname(video_file), "concat_list.txt")
+
+                            # 两段流拷贝互不依赖，用 Popen 并发跑，总耗时取较长的一段；
+                            # 哪段失败就单独走 run_ffmpeg 重跑（带非关键帧重编码降级）
+                            part_cmds = [
+                                ['-y', '-i', video_file, '-to', trim_start, '-c', 'copy', output_part1],
+                                ['-y', '-i', video_file, '-ss', trim_end, '-c', 'copy', output_part2],
+                            ]
+                            part_procs = [subprocess.Popen(['ffmpeg'] + cmd,
+                                                           stdout=subprocess.DEVNULL,
+                                                           stderr=subprocess.DEVNULL)
+                                          for cmd in part_cmds]
+                            for cmd, proc in zip(part_cmds, part_procs):
+                                if proc.wait() != 0:
+                                    run_ffmpeg(cmd)
+
+                            # 列表先在内存里拼好，一次 open 写入（原来 'w' 再 'a' 开两次文件）；
+                            # os.stat 一次拿到存在性和大小，不做 exists+getsize 两次调用
+                            lines = []
+                            for part in (output_part1, output_part2):
+                                try:
+                                    if os.stat(part).st_size > 0:
+                                        lines.append(f"file '{part}'")
+                                except OSError:
+                                    pass
                             with open(temp_concat_file, 'w') as f:
-                                f.write(f"file '{output_part1}'\n")
-                        if os.path.exists(output_part2) and os.path.getsize(output_part2) > 0:
-                            with open(temp_concat_file, 'a') as f:
-                                f.write(f"file '{output_part2}'\n")
-                        
-                        subprocess.run(['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', temp_concat_file,
-                                                '-c', 'copy', output_video_trimmed], check=True)
-                        
+                                f.write('\n'.join(lines) + '\n')
+
+                            run_ffmpeg(['-y', '-f', 'concat', '-safe', '0', '-i', temp_concat_file,
+                                        '-c', 'copy', output_video_trimmed])
+
                         if os.path.exists(output_video_trimmed) and os.path.getsize(output_video_trimmed) > 0:
                             os.replace(output_video_trimmed, video_file)
                             st.success(f"视频剪辑完成！")
@@ -2606,7 +3420,7 @@ with tab1:
         else:
             st.info("剪辑未启用，跳过")
     
-    trimmed_video = os.path.splitext(mp3_file)[0] + ".mp4"
+    trimmed_video = final_video
     
     upload_config_file = os.path.join(TEMP_DIR, "subtitles", "upload_config.pkl")
     loaded_title_desc = None
@@ -2614,9 +3428,7 @@ with tab1:
     
     if os.path.exists(upload_config_file):
         try:
-            import pickle
-            with open(upload_config_file, 'rb') as f:
-                loaded_data = pickle.load(f)
+            loaded_data = load_upload_config(upload_config_file, os.path.getmtime(upload_config_file))
             loaded_title_desc = loaded_data.get('title_desc')
             loaded_tags_list = loaded_data.get('tags')
         except Exception:
@@ -2647,54 +3459,101 @@ with tab1:
             elif not os.path.exists(cover_file_path_input):
                 st.error(f"封面文件不存在: {cover_file_path_input}")
             else:
-                with st.spinner("正在上传到B站..."):
-                    try:
-                        credential = Credential(
-                            sessdata=BILI_SESSDATA,
-                            bili_jct=env_config.get("BILI_BILI_JCT", "")
-                        )
-                        
-                        vu_meta = VideoMeta(
-                            tid=130,
+                # 上传放到后台线程里跑：几个 GB 的上传会把脚本线程卡死几十分钟，
+                # 期间页面像挂了一样；线程只改共享的状态 dict，
+                # 前台用 fragment 定时轮询渲染，与 tab0 工作流面板同一套模式
+                upload_state = {'status': 'running', 'events': 0, 'last_event': '',
+                                'error': None, 'trace': None}
+                st.session_state['bili_upload_state'] = upload_state
+
+                credential = Credential(
+                    sessdata=BILI_SESSDATA,
+                    bili_jct=env_config.get("BILI_BILI_JCT", "")
+                )
+
+                vu_meta = VideoMeta(
+                    tid=130,
+                    title=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
+                    tags=tags.split(',') if tags else ['科技'],
+                    desc=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
+                    cover=cover_file_path_input,
+                    no_reprint=True
+                )
+
+                def _do_upload(state):
+                    async def main_upload():
+                        page = VideoUploaderPage(
+                            path=video_file,
                             title=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
-                            tags=tags.split(',') if tags else ['科技'],
-                            desc=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
-                            cover=cover_file_path_input,
-                            no_reprint=True
+                            description=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
                         )
-                        
-                        async def main_upload():
-                            page = VideoUploaderPage(
-                                path=video_file,
-                                title=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
-                                description=title or "(中配)AI幻觉造出科学发现？！#ai幻觉",
-                            )
-                            
-                            uploader = video_uploader.VideoUploader([page], vu_meta, credential, line=video_uploader.Lines.QN)
-                            
-                            @uploader.on("__ALL__")
-                            async def ev(data):
-                                pass
-                            
-                            await uploader.start()
-                            
+
+                        uploader = video_uploader.VideoUploader([page], vu_meta, credential, line=video_uploader.Lines.QN)
+
+                        @uploader.on("__ALL__")
+                        async def ev(data):
+                            # 原来事件被整个丢弃；现在至少把计数和最近一条喂给前台
+                            state['events'] += 1
+                            state['last_event'] = str(data)[:200]
+
+                        await uploader.start()
+
+                    try:
                         asyncio.run(main_upload())
-                        
-                        st.success("上传完成！")
+                        state['status'] = 'success'
                     except Exception as e:
-                        import traceback
-                        st.error(f"上传失败: {str(e)}")
-                        with st.expander("🔍 查看详细错误信息"):
-                            st.code(traceback.format_exc(), language="python")
-                        
-                        st.markdown("### 配置检查")
-                        st.text(f"BILI_SESSDATA: {'已设置' if BILI_SESSDATA else '未设置'} (长度: {len(BILI_SESSDATA)})")
-                        st.text(f"BILI_ACCESS_KEY_ID: {'已设置' if BILI_ACCESS_KEY_ID else '未设置'}")
-                        st.text(f"BILI_ACCESS_KEY_SECRET: {'已设置' if BILI_ACCESS_KEY_SECRET else '未设置'}")
-                        st.text(f"视频文件: {video_file}")
-                        st.text(f"封面文件: {cover_file_path_input}")
-                        st.text(f"视频文件大小: {os.path.getsize(video_file) / 1024 / 1024:.2f} MB" if os.path.exists(video_file) else "视频文件不存在")
-                        st.text(f"封面文件大小: {os.path.getsize(cover_file_path_input) / 1024:.2f} KB" if os.path.exists(cover_file_path_input) else "封面文件不存在")
+                        state['error'] = str(e)
+                        state['trace'] = traceback.format_exc()
+                        state['status'] = 'error'
+
+                threading.Thread(target=_do_upload, args=(upload_state,), daemon=True).start()
+
+        upload_state = st.session_state.get('bili_upload_state')
+        if upload_state:
+            def _render_upload_state(state):
+                if state['status'] == 'running':
+                    st.info(f"正在上传到B站...（已收到 {state['events']} 个进度事件）")
+                    if state['last_event']:
+                        st.caption(state['last_event'])
+                elif state['status'] == 'success':
+                    st.success("上传完成！")
+                else:
+                    st.error(f"上传失败: {state['error']}")
+                    with st.expander("🔍 查看详细错误信息"):
+                        st.code(state['trace'], language="python")
+
+                    st.markdown("### 配置检查")
+                    st.text(f"BILI_SESSDATA: {'已设置' if BILI_SESSDATA else '未设置'} (长度: {len(BILI_SESSDATA)})")
+                    st.text(f"BILI_ACCESS_KEY_ID: {'已设置' if BILI_ACCESS_KEY_ID else '未设置'}")
+                    st.text(f"BILI_ACCESS_KEY_SECRET: {'已设置' if BILI_ACCESS_KEY_SECRET else '未设置'}")
+                    st.text(f"视频文件: {video_file}")
+                    st.text(f"封面文件: {cover_file_path_input}")
+                    # os.stat 一次拿到存在性和大小，不做 exists+getsize 两次调用
+                    try:
+                        st.text(f"视频文件大小: {os.stat(video_file).st_size / 1024 / 1024:.2f} MB")
+                    except OSError:
+                        st.text("视频文件不存在")
+                    try:
+                        st.text(f"封面文件大小: {os.stat(cover_file_path_input).st_size / 1024:.2f} KB")
+                    except OSError:
+                        st.text("封面文件不存在")
+
+            if upload_state['status'] == 'running' and hasattr(st, "fragment"):
+                @st.fragment(run_every=2)
+                def _upload_status_panel():
+                    state = st.session_state.get('bili_upload_state')
+                    if state and state['status'] != 'running':
+                        # 终态时升级成整页刷新，fragment 不再每 2 秒空转
+                        st.rerun(scope="app")
+                    _render_upload_state(state)
+                _upload_status_panel()
+            elif upload_state['status'] == 'running':
+                # 旧版 Streamlit 没有 fragment：退回整页轮询
+                _render_upload_state(upload_state)
+                time.sleep(2)
+                st.rerun()
+            else:
+                _render_upload_state(upload_state)
 
 st.markdown("---")
 st.info("💡 注意事项：")
@@ -1,17 +1,86 @@
 
 import os
 import re
+import sys
+import time
 import argparse
 import asyncio
 import traceback
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pydub import AudioSegment
 import edge_tts
 import random
+import shutil
+import hashlib
 import subprocess
 
+try:
+    # libuv 事件循环：WebSocket 密集的 edge-tts 客户端 socket 分发快 2-4 倍；
+    # 策略在 fork 出的回退 worker 里同样生效
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 # --- Helper Functions from worker_utils.py (duplicated to be standalone) ---
 
+# 正则都在 import 时编译一次：大的分段 alternation 每次调用重编译要几十毫秒，
+# 时间戳和文件名清洗的小模式则是每个段落都要跑
+_SEG_RE = re.compile(
+    r'[\\(（](\d{1,2})?:?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\\)）](.+?)'
+    r'(?=[\\(（](?:\d{1,2})?:?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\\)）]|$)',
+    re.DOTALL)
+_TS_HEAD_RE = re.compile(r'[\\(（](.+?)[\\)）]')
+_TS_RE = re.compile(r'[\(（](?:(\d{1,2}):)?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\)）]')
+_TS_CLEAN_RE = re.compile(r'[^\w\d]+')
+
+# (voice, text) 内容寻址的 TTS 缓存目录，由 process_tts 设置；None 表示禁用。
+# 同一视频改了三行重跑时，其余段落直接拷缓存，不再重新合成也不打扰 edge-tts
+_TTS_CACHE_DIR = None
+
+def _tts_cache_path(txt, voice):
+    if not _TTS_CACHE_DIR:
+        return None
+    key = hashlib.blake2b(f"{voice}\x00{txt}".encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(_TTS_CACHE_DIR, key + ".mp3")
+
+class _TokenBucket:
+    """进程内共享的异步令牌桶。
+
+    每次重试的指数退避是各协程自己的事，但发起请求的节奏必须全局限流：
+    几十个协程同时开播会一起撞 503，再各自退避，形成惊群。
+    桶以 rate 次/秒补充令牌，没令牌的协程排队等到下一个令牌为止。
+    """
+    def __init__(self, rate=8.0, capacity=8.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        # Lock 绑定事件循环；换了循环（如回退路径各自建环）就重建
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0:
+                # 持锁等待即是排队：后来者按到达顺序以 rate 的节奏放行
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+                self.tokens = 0.0
+                self.updated = time.monotonic()
+            else:
+                self.tokens -= 1.0
+
+_TTS_LIMITER = _TokenBucket()
+
 async def text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_retries=5):
     """
     将文本转换为语音并保存为音频文件
@@ -25,8 +94,14 @@ async def text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_re
                 delay = base_delay * (2 ** (retry_count - 1)) + (random.random() * 0.5)
                 print(f"第{retry_count}次重试，等待{delay:.2f}秒后继续...", flush=True)
                 await asyncio.sleep(delay)
+            await _TTS_LIMITER.acquire()
             communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(output_file)
+            # 音频块一到就写盘，worker 峰值内存从整段 MP3 降到单块；
+            # 'wb' 重开自带截断，重试不会残留上一次的半截数据
+            with open(output_file, 'wb') as f:
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        f.write(chunk["data"])
             print(f"[TTS-DEBUG] 成功保存音频: {output_file}", flush=True)
             return
         except Exception as e:
@@ -54,7 +129,27 @@ def run_text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_retr
         loop.close()
 
 def parse_timestamp(timestamp):
-    match = re.match(r'[\(（](?:(\d{1,2}):)?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\)）]', timestamp)
+    # 快路径：定形时间戳直接 split 求值，不进正则引擎（每个段落都要调一次）；
+    # 任何不合形状的输入落回原来的正则解析
+    ts = timestamp.strip().strip('()（）')
+    hms, _, ms = ts.partition('.')
+    parts = hms.split(':')
+    try:
+        if len(parts) == 2:
+            hours, minutes, seconds = 0, int(parts[0]), int(parts[1])
+        elif len(parts) == 3:
+            hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
+        else:
+            return _parse_timestamp_re(timestamp)
+        total_ms = (hours * 3600 + minutes * 60 + seconds) * 1000
+        if ms:
+            total_ms += int(ms[:3].ljust(3, '0'))
+        return total_ms
+    except ValueError:
+        return _parse_timestamp_re(timestamp)
+
+def _parse_timestamp_re(timestamp):
+    match = _TS_RE.match(timestamp)
     if match:
         hours, minutes, seconds, milliseconds = match.groups()
         total_ms = 0
@@ -73,7 +168,7 @@ def process_segment(task):
     """
     i, timestamp, txt, temp_dir, voice = task
     try:
-        cleaned_timestamp = re.sub(r'[^\w\d]+', '_', timestamp)
+        cleaned_timestamp = _TS_CLEAN_RE.sub('_', timestamp)
         file_name = f"{cleaned_timestamp}.mp3"
         output_file = os.path.join(temp_dir, file_name)
 
@@ -86,52 +181,146 @@ def process_segment(task):
     except Exception as e:
         return i, None, None, f"处理段落 {i+1} 时出错: {str(e)}"
 
+async def process_segment_async(task):
+    """
+    process_segment 的协程版：直接 await text_to_speech，
+    在单进程事件循环里与其他段落并发，不再经过 run_text_to_speech 的
+    新建事件循环包装。返回值与 process_segment 保持一致。
+    """
+    i, timestamp, txt, temp_dir, voice = task
+    try:
+        cleaned_timestamp = _TS_CLEAN_RE.sub('_', timestamp)
+        file_name = f"{cleaned_timestamp}.mp3"
+        output_file = os.path.join(temp_dir, file_name)
+
+        cache_path = _tts_cache_path(txt, voice)
+        if cache_path and os.path.exists(cache_path) and os.path.getsize(cache_path) > 0:
+            shutil.copyfile(cache_path, output_file)
+            print(f"段落 {i+1} 命中TTS缓存: {timestamp}", flush=True)
+        else:
+            print(f"协程正在处理段落 {i+1}: {timestamp} - {txt[:30]}...", flush=True)
+            await text_to_speech(txt, output_file, voice)
+            if cache_path:
+                try:
+                    # 先写 .tmp 再原子替换，崩溃不会留下半截缓存
+                    shutil.copyfile(output_file, cache_path + '.tmp')
+                    os.replace(cache_path + '.tmp', cache_path)
+                except OSError as e:
+                    print(f"写入TTS缓存失败: {e}", flush=True)
+            print(f"段落 {i+1} 处理完成", flush=True)
+
+        time_ms = parse_timestamp(f"({timestamp})")
+        return i, output_file, time_ms, None
+    except Exception as e:
+        return i, None, None, f"处理段落 {i+1} 时出错: {str(e)}"
+
 def adjust_audio_speed(task):
     """
     调整音频速度的函数，用于多进程处理
+    直接让 ffmpeg 读取原始 mp3 并解码+变速+编码一次完成，
+    主进程无需预先导出副本
     """
-    i, temp_output, target_duration, speed_factor = task
-    temp_output_processed = temp_output + '.tmp.mp3'
+    i, source_file, target_duration, speed_factor = task
+    adjusted_file = source_file.replace('.mp3', '_speed.mp3')
     try:
         subprocess.run([
-            'ffmpeg', '-y', '-i', temp_output,
+            'ffmpeg', '-y', '-i', source_file,
             '-filter:a', f'lowpass=f=8000,atempo={speed_factor}',
-            temp_output_processed
+            adjusted_file
         ], check=True, capture_output=True)
-        # Replace original file with processed one
-        os.replace(temp_output_processed, temp_output)
-        return i, temp_output, None  # 返回实际的文件路径
+        return i, adjusted_file, None  # 返回实际的文件路径
     except subprocess.CalledProcessError as e:
-        if os.path.exists(temp_output_processed):
-            os.remove(temp_output_processed)
+        try:
+            os.unlink(adjusted_file)
+        except FileNotFoundError:
+            pass
         return i, None, f"音频速度调整失败 {i+1}: {e}"
 
 # --- Main Logic ---
 
-def process_tts(txt_file_path, output_mp3_path, voice, max_workers, temp_dir_root):
+@lru_cache(maxsize=1024)
+def _silent(duration_ms):
+    """按时长缓存静音段，避免重复分配零填充缓冲；AudioSegment 不可变，复用安全。"""
+    return AudioSegment.silent(duration=duration_ms)
+
+def mix_segments_with_ffmpeg(segments, output_path):
+    """
+    用单个 ffmpeg 进程完成整段混音：
+    每个片段通过 adelay 定位到自己的起始时间，再由 amix 叠加输出；
+    需要变速的片段把 atempo 直接挂在该输入的滤镜链上，
+    因此不再产生任何 _speed.mp3 中间文件。
+    ffmpeg 边解码边流式写出，Python 侧无需在内存中拼接完整音频。
+    segments: [(file_path, start_ms, speed_factor 或 None), ...]
+    """
+    cmd = ['ffmpeg', '-y']
+    for file_path, _, _ in segments:
+        cmd.extend(['-i', file_path])
+
+    filter_parts = []
+    labels = []
+    for idx, (_, start_ms, factor) in enumerate(segments):
+        delay = max(int(start_ms), 0)
+        chain = f"lowpass=f=8000,atempo={factor}," if factor else ""
+        filter_parts.append(f"[{idx}:a]{chain}adelay={delay}|{delay}[a{idx}]")
+        labels.append(f"[a{idx}]")
+    filter_parts.append(f"{''.join(labels)}amix=inputs={len(segments)}:normalize=0[out]")
+
+    # TTS 人声源本就是 24kHz 单声道：显式 64k 单声道输出对人声透明，
+    # 体积和编码时间约减半，后面合流/上传也少搬一半字节
+    cmd.extend(['-filter_complex', ';'.join(filter_parts), '-map', '[out]',
+                '-ar', '24000', '-ac', '1', '-b:a', '64k', output_path])
+    subprocess.run(cmd, check=True, capture_output=True)
+
+def adjust_speed_batch_with_ffmpeg(tasks):
+    """一个 ffmpeg 进程完成全部变速任务。
+
+    每个输入挂自己的 lowpass+atempo 滤镜链，对应一个 -map 输出写
+    _speed.mp3；N 段就是 N 次 fork+exec+libav 初始化变成 1 次。
+    tasks: [(i, source_file, target_duration, speed_factor), ...]
+    """
+    cmd = ['ffmpeg', '-y']
+    for _, source_file, _, _ in tasks:
+        cmd.extend(['-i', source_file])
+
+    filter_parts = [f"[{idx}:a]lowpass=f=8000,atempo={factor}[a{idx}]"
+                    for idx, (_, _, _, factor) in enumerate(tasks)]
+    cmd.extend(['-filter_complex', ';'.join(filter_parts)])
+    for idx, (_, source_file, _, _) in enumerate(tasks):
+        cmd.extend(['-map', f'[a{idx}]', source_file.replace('.mp3', '_speed.mp3')])
+
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+
+def process_tts(txt_file_path, output_mp3_path, voice, max_workers, temp_dir_root,
+                cache_dir=None):
     print("="*50, flush=True)
     print("开始TTS转换流程 (独立进程)", flush=True)
     print("="*50, flush=True)
 
+    # 默认缓存放在 temp 根下：同一视频反复调整文案重跑时命中，
+    # 换视频（temp 被清空）时自然一起失效
+    global _TTS_CACHE_DIR
+    _TTS_CACHE_DIR = cache_dir or os.path.join(temp_dir_root, "tts_cache")
+    try:
+        os.makedirs(_TTS_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"创建TTS缓存目录失败({e})，本次禁用缓存", flush=True)
+        _TTS_CACHE_DIR = None
+
     with open(txt_file_path, 'r', encoding='utf-8') as f:
         content = f.read()
 
     print(f"txt_file_path: {txt_file_path}", flush=True)
     print(f"content长度: {len(content)} 字符", flush=True)
 
-    pattern = r'[\\(（](\d{1,2})?:?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\\)）](.+?)(?=[\\(（](?:\d{1,2})?:?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\\)）]|$)'
-    matches = list(re.finditer(pattern, content, re.DOTALL))
-    print(f"匹配到的segments数量: {len(matches)}", flush=True)
-
+    # 懒迭代 finditer，不先物化整份匹配列表
     segments = []
-    for match in matches:
-        timestamp_string = match.group(0)
+    for match in _SEG_RE.finditer(content):
         content_text = match.group(5).strip()
         if content_text:
-            timestamp_match = re.match(r'[\\(（](.+?)[\\)）]', timestamp_string)
+            timestamp_match = _TS_HEAD_RE.match(match.group(0))
             if timestamp_match:
-                timestamp = timestamp_match.group(1)
-                segments.append((timestamp, content_text))
+                segments.append((timestamp_match.group(1), content_text))
 
     print(f"解析出的segments数量: {len(segments)}", flush=True)
     
@@ -143,19 +332,95 @@ def process_tts(txt_file_path, output_mp3_path, voice, max_workers, temp_dir_roo
     for i, (timestamp, txt) in enumerate(segments):
         tasks.append((i, timestamp, txt, temp_dir, voice))
 
-    print(f"开始使用 {max_workers} 个进程处理TTS...", flush=True)
-    
     audio_files = [None] * len(tasks)
-    
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(process_segment, task) for task in tasks]
 
-        for future in as_completed(futures):
-            index, output_file, time_ms, error = future.result()
+    # 合成与解码流水线化：某段 TTS 一落盘就交给单线程解码池预解码
+    # （from_file 本质是等 ffmpeg 子进程，和剩余段落的网络合成完全重叠），
+    # 到混音阶段大部分片段已经解码完毕
+    decode_pool = ThreadPoolExecutor(max_workers=1)
+    decode_futures = {}
+
+    # 相同文本只合成一次：口头禅、章节口号在转写里重复率可观，
+    # 其余出现位置直接复制首个产物，再省下一批 edge-tts 请求
+    dup_groups = {}
+    for task in tasks:
+        dup_groups.setdefault(task[2], []).append(task)
+    dup_count = len(tasks) - len(dup_groups)
+    if dup_count:
+        print(f"检测到 {dup_count} 个重复文本段落，将复用合成结果", flush=True)
+
+    # edge-tts 是纯 WebSocket I/O，单进程事件循环 + 信号量限流就能吃满带宽，
+    # 不必为每个 worker fork 一个完整 Python 进程再各建一个事件循环；
+    # 信号量放大到 4 倍 worker 数，同一 CPU 预算下在途请求多 4 倍
+    async def _run_all():
+        sem = asyncio.Semaphore(max_workers * 4)
+
+        async def run_group(group):
+            async with sem:
+                res = await process_segment_async(group[0])
+            _, output_file, _, error = res
+            if output_file and not error:
+                decode_futures[output_file] = decode_pool.submit(
+                    AudioSegment.from_file, output_file)
+            results = [res]
+            for i, timestamp, txt, seg_temp_dir, _ in group[1:]:
+                if output_file and not error:
+                    other_out = os.path.join(
+                        seg_temp_dir, _TS_CLEAN_RE.sub('_', timestamp) + ".mp3")
+                    try:
+                        if other_out != output_file:
+                            shutil.copyfile(output_file, other_out)
+                        results.append((i, other_out,
+                                        parse_timestamp(f"({timestamp})"), None))
+                        continue
+                    except OSError as e:
+                        results.append((i, None, None,
+                                        f"复制重复段落 {i+1} 失败: {e}"))
+                        continue
+                results.append((i, None, None, error))
+            return results
+
+        grouped = await asyncio.gather(*(run_group(g) for g in dup_groups.values()),
+                                       return_exceptions=True)
+        flat = []
+        for item in grouped:
+            if isinstance(item, BaseException):
+                flat.append(item)
+            else:
+                flat.extend(item)
+        return flat
+
+    print(f"开始异步处理TTS（并发上限 {max_workers * 4}）...", flush=True)
+    try:
+        results = asyncio.run(_run_all())
+    except Exception as e:
+        print(f"异步TTS失败({e})，回退到多进程模式...", flush=True)
+        results = None
+
+    if results is not None:
+        # 合成已全部结束，目录快照一次，存在性检查全部走内存集合，
+        # 不再对每个文件各发一次 stat
+        existing = set(os.listdir(temp_dir))
+        for res in results:
+            if isinstance(res, BaseException):
+                print(f"警告: TTS任务异常: {res}", flush=True)
+                continue
+            index, output_file, time_ms, error = res
             if error:
                 print(f"警告: {error}", flush=True)
-            if output_file and os.path.exists(output_file):
+            if output_file and os.path.basename(output_file) in existing:
                 audio_files[index] = (output_file, time_ms)
+    else:
+        print(f"开始使用 {max_workers} 个进程处理TTS...", flush=True)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(process_segment, task) for task in tasks]
+
+            for future in as_completed(futures):
+                index, output_file, time_ms, error = future.result()
+                if error:
+                    print(f"警告: {error}", flush=True)
+                if output_file and os.path.exists(output_file):
+                    audio_files[index] = (output_file, time_ms)
 
     audio_files = [af for af in audio_files if af is not None]
     
@@ -166,85 +431,122 @@ def process_tts(txt_file_path, output_mp3_path, voice, max_workers, temp_dir_roo
         # 音频速度调整以避免重叠
         print("开始音频速度调整...", flush=True)
 
+        # 每段的 _speed.mp3 路径只派生一次，后续统一复用缓存字段；
+        # 解码优先收割流水线里的预解码结果，没赶上的再就地解码
         processed_audio_segments = []
         for i, (audio_file_path, time_ms) in enumerate(audio_files):
-            audio = AudioSegment.from_file(audio_file_path)
-            processed_audio_segments.append((audio_file_path, time_ms, audio))
+            fut = decode_futures.get(audio_file_path)
+            try:
+                audio = fut.result() if fut is not None else AudioSegment.from_file(audio_file_path)
+            except Exception as e:
+                print(f"预解码失败({e})，重新解码 {audio_file_path}", flush=True)
+                audio = AudioSegment.from_file(audio_file_path)
+            speed_path = audio_file_path.replace('.mp3', '_speed.mp3')
+            processed_audio_segments.append((audio_file_path, speed_path, time_ms, audio))
+        decode_pool.shutdown()
 
         speed_adjust_tasks_list = []
-        
-        for i, (audio_file_path, time_ms, audio) in enumerate(processed_audio_segments[:-1]):
+
+        for i, (audio_file_path, speed_path, time_ms, audio) in enumerate(processed_audio_segments[:-1]):
             current_len = len(audio)
             end_time = time_ms + current_len
 
             if i + 1 < len(processed_audio_segments):
-                next_start = processed_audio_segments[i+1][1]
+                next_start = processed_audio_segments[i+1][2]
                 if end_time > next_start + 100:
                     target = next_start - time_ms - 50
-                    if target > 100:
-                        factor = min(current_len / target, 2.0)
-                        print(f"片段{i}: 需要加速 因子={factor:.2f}", flush=True)
-                        if factor > 1.0:
-                            temp_speed_file = audio_file_path.replace('.mp3', '_speed.mp3')
-                            audio.export(temp_speed_file, format="mp3")
-                            speed_adjust_tasks_list.append((i, temp_speed_file, target, factor))
-
-        if speed_adjust_tasks_list:
-            print(f"开始处理 {len(speed_adjust_tasks_list)} 个音频速度调整任务...", flush=True)
-            with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(adjust_audio_speed, task) for task in speed_adjust_tasks_list]
-                for future in as_completed(futures):
-                    try:
-                        result = future.result()
-                        if result and len(result) >= 3:
-                            i, adjusted_file_path, error = result
-                            if error:
-                                print(f"速度调整失败 {i}: {error}", flush=True)
-                    except Exception as e:
-                        print(f"音频速度调整任务失败: {e}", flush=True)
+                    # 先做边界判断，不满足就直接跳过，避免对不需要调整的
+                    # 片段做多余的计算和打印
+                    if target <= 100:
+                        continue
+                    factor = min(current_len / target, 2.0)
+                    if factor <= 1.0:
+                        continue
+                    print(f"片段{i}: 需要加速 因子={factor:.2f}", flush=True)
+                    speed_adjust_tasks_list.append((i, audio_file_path, target, factor))
+
+        speed_factors = {i: factor for i, _, _, factor in speed_adjust_tasks_list}
 
         # Final Mix
         print(f"开始混音 {len(processed_audio_segments)} 个音频片段", flush=True)
-        final_audio_segments = []
-        for audio_file_path, time_ms, original_audio in processed_audio_segments:
-            adjusted_file = audio_file_path.replace('.mp3', '_speed.mp3')
-            if os.path.exists(adjusted_file):
+        try:
+            # 主路径：变速 + 定位 + 混音在同一个 ffmpeg 进程里完成，
+            # 不写任何 _speed.mp3 中间文件
+            mix_segments_with_ffmpeg(
+                [(path, time_ms, speed_factors.get(idx))
+                 for idx, (path, _, time_ms, _) in enumerate(processed_audio_segments)],
+                output_mp3_path
+            )
+        except Exception as e:
+            # ffmpeg 不可用或参数超限时回退：先跑独立的变速任务，再用 pydub 拼接
+            print(f"ffmpeg 混音失败({e})，回退到 pydub 拼接...", flush=True)
+
+            if speed_adjust_tasks_list:
+                print(f"开始处理 {len(speed_adjust_tasks_list)} 个音频速度调整任务...", flush=True)
                 try:
-                    adjusted_audio = AudioSegment.from_file(adjusted_file)
-                    final_audio_segments.append((adjusted_file, time_ms, adjusted_audio))
+                    # 全部变速塞进一个 ffmpeg 进程，省掉每段一次的进程启动
+                    adjust_speed_batch_with_ffmpeg(speed_adjust_tasks_list)
                 except Exception as e:
+                    print(f"批量变速失败({e})，回退到逐段变速...", flush=True)
+                    # 任务本身只是等待 ffmpeg 子进程，用线程池即可，
+                    # 省掉为每个 worker 再 fork 一个 Python 进程的开销
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        futures = [executor.submit(adjust_audio_speed, task) for task in speed_adjust_tasks_list]
+                        for future in as_completed(futures):
+                            try:
+                                result = future.result()
+                                if result and len(result) >= 3:
+                                    i, adjusted_file_path, error = result
+                                    if error:
+                                        print(f"速度调整失败 {i}: {error}", flush=True)
+                            except Exception as e:
+                                print(f"音频速度调整任务失败: {e}", flush=True)
+
+            final_audio_segments = []
+            # 变速批任务已全部落盘，同样只快照一次目录
+            speed_existing = set(os.listdir(temp_dir))
+            for audio_file_path, speed_path, time_ms, original_audio in processed_audio_segments:
+                if os.path.basename(speed_path) in speed_existing:
+                    try:
+                        adjusted_audio = AudioSegment.from_file(speed_path)
+                        final_audio_segments.append((speed_path, time_ms, adjusted_audio))
+                    except Exception as e:
+                        final_audio_segments.append((audio_file_path, time_ms, original_audio))
+                else:
                     final_audio_segments.append((audio_file_path, time_ms, original_audio))
-            else:
-                final_audio_segments.append((audio_file_path, time_ms, original_audio))
-
-        combined_audio = AudioSegment.empty()
-        current_pos = 0
-        
-        for i, (audio_file_path, start_ms, audio_segment) in enumerate(final_audio_segments):
-            if start_ms > current_pos:
-                silence_gap = start_ms - current_pos
-                combined_audio += AudioSegment.silent(duration=silence_gap)
-                current_pos += silence_gap
-            combined_audio += audio_segment
-            current_pos += len(audio_segment)
-            
-            if i % 10 == 0:
-                print(f"已处理 {i+1}/{len(final_audio_segments)} 段", flush=True)
-
-        combined_audio.export(output_mp3_path, format="mp3")
+
+            # 先铺出 片段+静音 的有序列表，再两两归并：
+            # 逐段左折叠是 O(N²) 拷贝，两两归并只有 O(N log N)
+            parts = []
+            current_pos = 0
+
+            for audio_file_path, start_ms, audio_segment in final_audio_segments:
+                if start_ms > current_pos:
+                    silence_gap = start_ms - current_pos
+                    parts.append(_silent(silence_gap))
+                    current_pos += silence_gap
+                parts.append(audio_segment)
+                current_pos += len(audio_segment)
+
+            print(f"开始归并 {len(parts)} 个音频块", flush=True)
+            while len(parts) > 1:
+                parts = [parts[i] + parts[i + 1] if i + 1 < len(parts) else parts[i]
+                         for i in range(0, len(parts), 2)]
+
+            combined_audio = parts[0] if parts else AudioSegment.empty()
+            # 与主路径同规格：24kHz 单声道 64k 对 TTS 人声透明，体积减半
+            combined_audio.set_frame_rate(24000).set_channels(1).export(
+                output_mp3_path, format="mp3", bitrate="64k")
         print(f"最终音频已保存: {output_mp3_path}", flush=True)
 
-        # Cleanup
-        for fp, _ in audio_files:
-            if os.path.exists(fp):
-                try: os.remove(fp)
-                except: pass
-        
-        for item in final_audio_segments:
-            path = item[0]
-            if path.endswith('_speed.mp3') and os.path.exists(path):
-                 try: os.remove(path)
-                 except: pass
+        # Cleanup (去重后直接 unlink，避免 exists+remove 的多余 stat 和竞态)
+        cleanup_paths = {fp for fp, _ in audio_files}
+        cleanup_paths.update(sp for _, sp, _, _ in processed_audio_segments)
+        for path in cleanup_paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="TTS Runner")
@@ -253,11 +555,14 @@ if __name__ == "__main__":
     parser.add_argument("--voice", default="zh-CN-XiaoxiaoNeural", help="TTS Voice")
     parser.add_argument("--workers", type=int, default=4, help="Max workers")
     parser.add_argument("--temp", default=".", help="Temp directory root")
+    parser.add_argument("--cache-dir", default=None,
+                        help="TTS clip cache directory (default: <temp>/tts_cache)")
 
     args = parser.parse_args()
     
     try:
-        process_tts(args.input, args.output, args.voice, args.workers, args.temp)
+        process_tts(args.input, args.output, args.voice, args.workers, args.temp,
+                    cache_dir=args.cache_dir)
     except Exception as e:
         print(f"TTS Process Error: {e}", flush=True)
         traceback.print_exc()
@@ -5,6 +5,10 @@ import re
 import os
 import subprocess
 
+# 每个段落都要跑的小模式在 import 时编译一次
+_TS_RE = re.compile(r'[\(（](?:(\d{1,2}):)?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\)）]')
+_TS_CLEAN_RE = re.compile(r'[^\w\d]+')
+
 async def text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_retries=5):
     """
     将文本转换为语音并保存为音频文件
@@ -20,7 +24,12 @@ async def text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_re
                 print(f"第{retry_count}次重试，等待{delay:.2f}秒后继续...", flush=True)
                 await asyncio.sleep(delay)
             communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(output_file)
+            # 音频块一到就写盘，worker 峰值内存从整段 MP3 降到单块；
+            # 'wb' 重开自带截断，重试不会残留上一次的半截数据
+            with open(output_file, 'wb') as f:
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        f.write(chunk["data"])
             print(f"[TTS-DEBUG] 成功保存音频: {output_file}", flush=True)
             return  # 成功则退出循环
         except Exception as e:
@@ -51,7 +60,27 @@ def run_text_to_speech(text, output_file, voice="zh-CN-XiaoxiaoNeural", max_retr
         loop.close()
 
 def parse_timestamp(timestamp):
-    match = re.match(r'[\(（](?:(\d{1,2}):)?(\d{1,3}):(\d{1,2})(?:\.(\d{1,3}))?[\)）]', timestamp)
+    # 快路径：定形时间戳直接 split 求值，不进正则引擎（每个段落都要调一次）；
+    # 任何不合形状的输入落回原来的正则解析
+    ts = timestamp.strip().strip('()（）')
+    hms, _, ms = ts.partition('.')
+    parts = hms.split(':')
+    try:
+        if len(parts) == 2:
+            hours, minutes, seconds = 0, int(parts[0]), int(parts[1])
+        elif len(parts) == 3:
+            hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
+        else:
+            return _parse_timestamp_re(timestamp)
+        total_ms = (hours * 3600 + minutes * 60 + seconds) * 1000
+        if ms:
+            total_ms += int(ms[:3].ljust(3, '0'))
+        return total_ms
+    except ValueError:
+        return _parse_timestamp_re(timestamp)
+
+def _parse_timestamp_re(timestamp):
+    match = _TS_RE.match(timestamp)
     if match:
         hours, minutes, seconds, milliseconds = match.groups()
         total_ms = 0
@@ -70,7 +99,7 @@ def process_segment(task):
     """
     i, timestamp, txt, temp_dir, voice = task
     try:
-        cleaned_timestamp = re.sub(r'[^\w\d]+', '_', timestamp)
+        cleaned_timestamp = _TS_CLEAN_RE.sub('_', timestamp)
         file_name = f"{cleaned_timestamp}.mp3"
         output_file = os.path.join(temp_dir, file_name)
 
@@ -86,20 +115,22 @@ def process_segment(task):
 def adjust_audio_speed(task):
     """
     调整音频速度的函数，用于多进程处理
+    直接让 ffmpeg 读取原始 mp3 并解码+变速+编码一次完成，
+    主进程无需预先导出副本
     """
-    i, temp_output, target_duration, speed_factor = task
-    temp_output_processed = temp_output + '.tmp.mp3'
+    i, source_file, target_duration, speed_factor = task
+    adjusted_file = source_file.replace('.mp3', '_speed.mp3')
     try:
         subprocess.run([
-            'ffmpeg', '-y', '-i', temp_output,
+            'ffmpeg', '-y', '-i', source_file,
             '-filter:a', f'lowpass=f=8000,atempo={speed_factor}',
-            temp_output_processed
+            adjusted_file
         ], check=True, capture_output=True)
-        # Replace original file with processed one
-        os.replace(temp_output_processed, temp_output)
-        return i, temp_output, None  # 返回实际的文件路径
+        return i, adjusted_file, None  # 返回实际的文件路径
     except subprocess.CalledProcessError as e:
-        # Clean up temporary file if it exists
-        if os.path.exists(temp_output_processed):
-            os.remove(temp_output_processed)
+        # Clean up partially written file if it exists
+        try:
+            os.unlink(adjusted_file)
+        except FileNotFoundError:
+            pass
         return i, None, f"音频速度调整失败 {i+1}: {e}"